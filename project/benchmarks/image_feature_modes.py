@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare latency and memory of the ImageProcessor feature modes.
+
+Runs each mode (logits, embedding, truncated backbones) over the same
+synthetic images and reports per-image latency, parameter memory and the
+activation memory produced by one forward pass.
+
+Usage:
+    python benchmarks/image_feature_modes.py --images 32 --batch-size 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.processors.image_processor import ImageProcessor
+
+
+MODES = [
+    ('logits', None),
+    ('embedding', None),
+    ('truncated', 'layer3'),
+    ('truncated', 'layer2'),
+]
+
+
+def synthetic_images(count, seed=0, size=(320, 240)):
+    """Generate random RGB PIL images."""
+    rng = np.random.default_rng(seed)
+    return [
+        Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+        for _ in range(count)
+    ]
+
+
+def parameter_megabytes(model):
+    """Memory held by model parameters and buffers, in MiB."""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors) / 2 ** 20
+
+
+def activation_megabytes(model, batch):
+    """Total size of every leaf-module output for one forward pass, in MiB."""
+    total = [0]
+
+    def hook(module, inputs, output):
+        if isinstance(output, torch.Tensor):
+            total[0] += output.numel() * output.element_size()
+
+    handles = [m.register_forward_hook(hook)
+               for m in model.modules() if not list(m.children())]
+    try:
+        with torch.no_grad():
+            model(batch)
+    finally:
+        for handle in handles:
+            handle.remove()
+    return total[0] / 2 ** 20
+
+
+def benchmark_mode(images, mode, truncate_after, batch_size, repeats, pretrained):
+    """Time one feature mode and return a result dictionary."""
+    kwargs = {'feature_mode': mode, 'pretrained': pretrained, 'batch_size': batch_size}
+    if truncate_after:
+        kwargs['truncate_after'] = truncate_after
+    processor = ImageProcessor(**kwargs)
+
+    tensors = torch.stack([processor.transform(img) for img in images])
+
+    # Warm-up pass so allocator and kernel selection are excluded
+    with torch.no_grad():
+        processor.model(tensors[:batch_size].to(processor.device))
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with torch.no_grad():
+            for i in range(0, len(tensors), batch_size):
+                processor.model(tensors[i:i + batch_size].to(processor.device))
+        timings.append((time.perf_counter() - start) / len(tensors))
+
+    return {
+        'mode': mode if not truncate_after else f'{mode}:{truncate_after}',
+        'feature_dim': processor.feature_dim,
+        'ms_per_image_mean': 1000 * float(np.mean(timings)),
+        'ms_per_image_min': 1000 * float(np.min(timings)),
+        'param_mb': parameter_megabytes(processor.model),
+        'activation_mb_per_batch': activation_megabytes(
+            processor.model, tensors[:batch_size].to(processor.device)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=32)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--pretrained', action='store_true',
+                        help='Download ImageNet weights instead of random init')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    images = synthetic_images(args.images)
+    results = [
+        benchmark_mode(images, mode, truncate_after, args.batch_size,
+                       args.repeats, args.pretrained)
+        for mode, truncate_after in MODES
+    ]
+
+    print(f"{'mode':<20}{'dim':>6}{'ms/img':>10}{'params MB':>12}{'acts MB':>10}")
+    for r in results:
+        print(f"{r['mode']:<20}{r['feature_dim']:>6}{r['ms_per_image_mean']:>10.2f}"
+              f"{r['param_mb']:>12.1f}{r['activation_mb_per_batch']:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the processing hot paths.
+
+Every input is generated from a fixed seed (random images, synthetic
+waveforms, random feature frames and expression sets) and the models are
+random-initialized, so runs need no network and time the same work every
+time. Each benchmark sweeps one size parameter; results are written as
+JSON and can be compared against an earlier run.
+
+Usage:
+    python benchmarks/run_benchmarks.py --quick --output before.json
+    python benchmarks/run_benchmarks.py --quick --output after.json --compare before.json
+    python benchmarks/run_benchmarks.py --only graph,math
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import wave
+
+import numpy as np
+import pandas as pd
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.processors.image_processor import ImageProcessor
+from src.processors.audio_processor import AudioProcessor
+from src.processors.data_integrator import DataIntegrator
+from src.utils.graph_analyzer import GraphAnalyzer
+from src.utils.math_analyzer import MathAnalyzer
+
+
+# Size sweeps per benchmark; 'quick' keeps a full run to a few minutes on a laptop CPU
+SWEEPS = {
+    'quick': {
+        'image.process_image': [(224, 224), (640, 480)],
+        'image.batch_process': [1, 8, 16],
+        'audio.extract_features': [1.0, 5.0],
+        'audio.batch_extract': [1, 8],
+        'integrator.combine_modalities': [1, 256, 4096],
+        'integrator.build_relationship_graph': [500, 2000],
+        'graph.analyze_relationships': [50, 200],
+        'graph.find_communities': [1000, 5000],
+        'math.symbolic_analysis': [5, 20],
+        'math.evaluate_batch': [1000, 100000],
+        'inference.image_profile': ['fp32', 'cpu_fp32', 'cpu'],
+        'inference.audio_profile': ['fp32', 'cpu'],
+    },
+    'full': {
+        'image.process_image': [(224, 224), (640, 480), (1920, 1080)],
+        'image.batch_process': [1, 8, 32],
+        'audio.extract_features': [1.0, 5.0, 30.0],
+        'audio.batch_extract': [1, 4, 16],
+        'integrator.combine_modalities': [1, 256, 4096, 32768],
+        'integrator.build_relationship_graph': [500, 2000, 8000, 20000],
+        'graph.analyze_relationships': [50, 200, 800],
+        'graph.find_communities': [1000, 10000, 50000],
+        'math.symbolic_analysis': [5, 20, 50],
+        'math.evaluate_batch': [1000, 100000, 1000000],
+        'inference.image_profile': ['fp32', 'cpu_fp32', 'cpu'],
+        'inference.audio_profile': ['fp32', 'cpu'],
+    },
+}
+IMAGES_PER_CALL = 4
+BATCH_IMAGES = 32
+AUDIO_CLIPS = 8
+AUDIO_CLIP_SECONDS = 3.0
+
+
+# --- Synthetic inputs -------------------------------------------------------
+
+def synthetic_image_bytes(count, size, seed=0):
+    """Random RGB images encoded as PNG bytes, as an upload would arrive."""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format='PNG')
+        images.append(buffer.getvalue())
+    return images
+
+
+def synthetic_wav_bytes(seconds, sample_rate=16000, channels=1, seed=0):
+    """A 16-bit PCM WAV of a few tones plus noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tones = sum(np.sin(2 * np.pi * f * t) for f in rng.uniform(100, 2000, size=3)) / 3
+    signal = 0.5 * tones[:, None] + 0.05 * rng.standard_normal((len(t), channels))
+    samples = (np.clip(signal, -1, 1) * 32767).astype('<i2')
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def synthetic_frame(rows, columns, seed=0, groups=8):
+    """Random feature frame whose columns fall into correlated groups."""
+    rng = np.random.default_rng(seed)
+    factors = rng.standard_normal((rows, groups))
+    membership = rng.integers(0, groups, size=columns)
+    values = factors[:, membership] + 0.7 * rng.standard_normal((rows, columns))
+    return pd.DataFrame(values, columns=[f'feature_{i}' for i in range(columns)])
+
+
+def clustered_vectors(count, dim=64, clusters=20, seed=0):
+    """Unit vectors scattered around a few centres, so similarity graphs have edges."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim))
+    vectors = centres[rng.integers(0, clusters, size=count)] + 0.6 * rng.standard_normal((count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def expression_set(count, seed=0):
+    """Distinct single-variable expressions mixing polynomials, trig and exponentials."""
+    rng = np.random.default_rng(seed)
+    terms = ['x**{p}', 'sin({k}*x)', 'cos({k}*x)', 'exp({k}*x)', 'log(x + {k})', 'x**{p}*sin(x)']
+    expressions = []
+    for _ in range(count):
+        picked = rng.choice(len(terms), size=3, replace=False)
+        parts = [f"{rng.integers(1, 9)}*" + terms[i].format(p=rng.integers(2, 6), k=rng.integers(1, 5))
+                 for i in picked]
+        expressions.append(' + '.join(parts))
+    return expressions
+
+
+# --- Benchmarks -------------------------------------------------------------
+# Each yields (params, callable, work units per call[, extra result fields])
+# for one sweep point.
+
+class Context:
+    """Processors shared by the benchmarks, built once with random weights."""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self._image = None
+        self._audio = None
+
+    @property
+    def image_processor(self):
+        if self._image is None:
+            torch.manual_seed(self.seed)
+            self._image = ImageProcessor(pretrained=False)
+        return self._image
+
+    @property
+    def audio_processor(self):
+        if self._audio is None:
+            torch.manual_seed(self.seed)
+            self._audio = AudioProcessor(pretrained=False)
+        return self._audio
+
+
+def bench_process_image(ctx, sweep):
+    processor = ctx.image_processor
+    for size in sweep:
+        images = synthetic_image_bytes(IMAGES_PER_CALL, size, ctx.seed)
+        yield ({'width': size[0], 'height': size[1]},
+               lambda images=images: [processor.process_image(image) for image in images],
+               IMAGES_PER_CALL)
+
+
+def bench_batch_process(ctx, sweep):
+    processor = ctx.image_processor
+    images = synthetic_image_bytes(BATCH_IMAGES, (320, 240), ctx.seed)
+    for batch_size in sweep:
+        yield ({'images': BATCH_IMAGES, 'batch_size': batch_size},
+               lambda batch_size=batch_size: processor.batch_process(images, batch_size=batch_size),
+               BATCH_IMAGES)
+
+
+def audio_decoding_works(processor, seed):
+    """
+    True if WAV bytes decode and embed for real.
+
+    extract_features falls back to mock features on any error, which
+    would be timed instead of the real path, so check once up front.
+    """
+    try:
+        processor._extract(synthetic_wav_bytes(1.0, seed=seed))
+        return True
+    except Exception as e:
+        print(f"⚠️ Audio decoding unavailable, skipping audio benchmarks: {e}".splitlines()[0])
+        return False
+
+
+def bench_extract_features(ctx, sweep):
+    processor = ctx.audio_processor
+    if not audio_decoding_works(processor, ctx.seed):
+        return
+    for seconds in sweep:
+        clip = synthetic_wav_bytes(seconds, seed=ctx.seed)
+        yield ({'seconds': seconds}, lambda clip=clip: processor.extract_features(clip), 1)
+
+
+def bench_batch_extract(ctx, sweep):
+    processor = ctx.audio_processor
+    if not audio_decoding_works(processor, ctx.seed):
+        return
+    clips = [synthetic_wav_bytes(AUDIO_CLIP_SECONDS * (1 + i % 3) / 2, seed=ctx.seed + i)
+             for i in range(AUDIO_CLIPS)]
+    for batch_size in sweep:
+        yield ({'clips': AUDIO_CLIPS, 'batch_size': batch_size},
+               lambda batch_size=batch_size: processor.batch_extract(clips, batch_size=batch_size),
+               AUDIO_CLIPS)
+
+
+def bench_combine_modalities(ctx, sweep):
+    rng = np.random.default_rng(ctx.seed)
+    for rows in sweep:
+        image = rng.standard_normal((rows, 1000)).astype(np.float32)
+        audio = torch.randn(rows, 768)
+        metadata = pd.DataFrame({
+            'quality': rng.uniform(0, 1, rows),
+            'count': rng.integers(0, 100, rows),
+            'source': rng.choice(['api', 'upload', 'batch'], rows),
+        })
+        integrator = DataIntegrator()
+        yield ({'rows': rows},
+               lambda image=image, audio=audio, metadata=metadata, integrator=integrator:
+                   integrator.combine_modalities(image, audio, metadata),
+               rows)
+
+
+def bench_build_relationship_graph(ctx, sweep):
+    integrator = DataIntegrator()
+    for count in sweep:
+        vectors = clustered_vectors(count, seed=ctx.seed)
+        for method in ('exact', 'ann'):
+            yield ({'items': count, 'method': method},
+                   lambda vectors=vectors, method=method: integrator.build_relationship_graph(
+                       vectors, threshold=0.5, include_features=False, method=method, k=10),
+                   count)
+
+
+def bench_analyze_relationships(ctx, sweep):
+    analyzer = GraphAnalyzer()
+    for columns in sweep:
+        frame = synthetic_frame(1000, columns, ctx.seed)
+        for threshold in (None, 0.3):
+            yield ({'features': columns, 'rows': 1000, 'threshold': threshold},
+                   lambda frame=frame, threshold=threshold:
+                       analyzer.analyze_relationships(frame, threshold=threshold),
+                   columns)
+
+
+def bench_find_communities(ctx, sweep):
+    analyzer = GraphAnalyzer()
+    integrator = DataIntegrator()
+    for count in sweep:
+        graph = integrator.build_relationship_graph(
+            clustered_vectors(count, seed=ctx.seed), threshold=0.5,
+            include_features=False, method='ann', k=10)
+        yield ({'nodes': count, 'edges': graph.number_of_edges()},
+               lambda graph=graph: analyzer.find_communities(graph, seed=ctx.seed),
+               count)
+
+
+def bench_symbolic_analysis(ctx, sweep):
+    for count in sweep:
+        expressions = expression_set(count, ctx.seed)
+
+        def cold(expressions=expressions):
+            analyzer = MathAnalyzer(cache_size=0)
+            return [analyzer.symbolic_analysis(e) for e in expressions]
+
+        warm_analyzer = MathAnalyzer()
+        yield ({'expressions': count, 'cache': 'cold'}, cold, count)
+        yield ({'expressions': count, 'cache': 'warm'},
+               lambda expressions=expressions, analyzer=warm_analyzer:
+                   [analyzer.symbolic_analysis(e) for e in expressions],
+               count)
+
+
+def bench_evaluate_batch(ctx, sweep):
+    analyzer = MathAnalyzer()
+    expressions = expression_set(5, ctx.seed)
+    for points in sweep:
+        x = np.linspace(0.1, 10, points)
+        yield ({'points': points, 'expressions': len(expressions)},
+               lambda x=x: [analyzer.evaluate_batch(e, {'x': x}) for e in expressions],
+               points * len(expressions))
+
+
+def bench_image_profile(ctx, sweep):
+    batch = torch.randn(8, 3, 224, 224, generator=torch.Generator().manual_seed(ctx.seed))
+    for profile in sweep:
+        torch.manual_seed(ctx.seed)
+        processor = ImageProcessor(pretrained=False, inference_profile=profile)
+        model = processor.model
+
+        def forward(model=model):
+            with torch.no_grad():
+                return model(batch)
+
+        yield ({'profile': profile, 'batch': len(batch)}, forward, len(batch),
+               {'inference': processor.inference_report})
+
+
+def bench_audio_profile(ctx, sweep):
+    waveform = torch.randn(1, 16000 * 5, generator=torch.Generator().manual_seed(ctx.seed))
+    for profile in sweep:
+        torch.manual_seed(ctx.seed)
+        processor = AudioProcessor(pretrained=False, inference_profile=profile)
+        if processor.model is None:
+            return
+        yield ({'profile': profile, 'seconds': 5},
+               lambda processor=processor: processor._embed_frames(waveform), 1,
+               {'inference': processor.inference_report})
+
+
+BENCHMARKS = {
+    'image.process_image': bench_process_image,
+    'image.batch_process': bench_batch_process,
+    'audio.extract_features': bench_extract_features,
+    'audio.batch_extract': bench_batch_extract,
+    'integrator.combine_modalities': bench_combine_modalities,
+    'integrator.build_relationship_graph': bench_build_relationship_graph,
+    'graph.analyze_relationships': bench_analyze_relationships,
+    'graph.find_communities': bench_find_communities,
+    'math.symbolic_analysis': bench_symbolic_analysis,
+    'math.evaluate_batch': bench_evaluate_batch,
+    'inference.image_profile': bench_image_profile,
+    'inference.audio_profile': bench_audio_profile,
+}
+
+
+# --- Runner -----------------------------------------------------------------
+
+def measure(func, repeats, warmup=1):
+    """Call func warmup + repeats times and summarize the timed calls."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'repeats': repeats,
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'min_s': min(timings),
+        'max_s': max(timings),
+        'stdev_s': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def environment():
+    """Describe the machine and library versions behind a run."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'torch': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def result_key(result):
+    return result['benchmark'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(results, baseline_path):
+    """Print the median-time ratio of each result against a baseline run."""
+    with open(baseline_path) as f:
+        baseline = {result_key(r): r for r in json.load(f)['results']}
+    print(f"\nComparison with {baseline_path} (ratio < 1 is faster)")
+    print(f"{'benchmark':<38}{'params':<44}{'before':>10}{'after':>10}{'ratio':>8}")
+    for result in results:
+        before = baseline.get(result_key(result))
+        if before is None:
+            continue
+        ratio = result['median_s'] / before['median_s'] if before['median_s'] else float('nan')
+        print(f"{result['benchmark']:<38}{result_key(result)[1][:43]:<44}"
+              f"{before['median_s'] * 1000:>8.1f}ms{result['median_s'] * 1000:>8.1f}ms{ratio:>8.2f}")
+
+
+def run(names, sweep, repeats, seed):
+    ctx = Context(seed)
+    results = []
+    for name in names:
+        for params, func, units, *extra in BENCHMARKS[name](ctx, sweep[name]):
+            timing = measure(func, repeats)
+            result = dict({'benchmark': name, 'params': params, 'units': units}, **timing)
+            for fields in extra:
+                result.update(fields)
+            result['units_per_second'] = units / timing['median_s'] if timing['median_s'] else None
+            results.append(result)
+            print(f"{name:<38}{json.dumps(params):<60}{timing['median_s'] * 1000:>10.2f} ms"
+                  f"{result['units_per_second'] or 0:>12.1f}/s", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='Smaller size sweeps')
+    parser.add_argument('--only', help='Comma-separated benchmark names or prefixes (e.g. image,graph)')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file from an earlier run')
+    parser.add_argument('--list', action='store_true', help='List benchmarks and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return
+
+    names = list(BENCHMARKS)
+    if args.only:
+        prefixes = [p.strip() for p in args.only.split(',') if p.strip()]
+        names = [n for n in names if any(n == p or n.startswith(p + '.') for p in prefixes)]
+        if not names:
+            parser.error(f"No benchmark matches {args.only!r}")
+
+    sweep = SWEEPS['quick' if args.quick else 'full']
+    results = run(names, sweep, args.repeats, args.seed)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({
+                'environment': environment(),
+                'settings': {'sweep': 'quick' if args.quick else 'full',
+                             'repeats': args.repeats, 'seed': args.seed},
+                'results': results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
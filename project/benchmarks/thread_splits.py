@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Compare throughput and latency of worker/thread splits for image inference.
+
+A fixed number of client threads send requests back to back, as concurrent
+web requests would. Each split bounds the forward passes running at once
+(workers) and gives each one a number of intra-op threads, through an
+ExecutionConfig. Splits use all available cores (workers x threads =
+cores); the 'unbounded' row runs every client at once with torch's default
+thread count, which is what the server did before execution limits.
+
+Usage:
+    python benchmarks/thread_splits.py --clients 8 --requests 64
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.processors.image_processor import ImageProcessor
+from src.utils.execution import ExecutionConfig, available_cpus
+
+
+def synthetic_jpeg(seed=0, size=(320, 240)):
+    """Encode a random RGB image as JPEG bytes."""
+    rng = np.random.default_rng(seed)
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def splits(cpus):
+    """(workers, threads) pairs that use exactly the given number of cores."""
+    return [(workers, cpus // workers) for workers in range(1, cpus + 1) if cpus % workers == 0]
+
+
+def run_load(processor, image, clients, requests):
+    """
+    Send requests from concurrent clients and time each one.
+
+    Returns:
+        (wall seconds, list of per-request latencies in seconds)
+    """
+    latencies = []
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def client():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            processor.process_image(image)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def benchmark_split(processor, image, execution, label, clients, requests):
+    """Run the load under one ExecutionConfig and return a result dictionary."""
+    processor.execution = execution
+    run_load(processor, image, clients, max(clients, 2))  # warm-up
+    wall, latencies = run_load(processor, image, clients, requests)
+    latencies = np.array(latencies) * 1000
+    return {
+        'split': label,
+        'workers': execution.max_concurrent_inferences if execution else clients,
+        'threads': execution.intra_op_threads if execution else torch.get_num_threads(),
+        'throughput_per_s': requests / wall,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads')
+    parser.add_argument('--requests', type=int, default=64, help='Requests per split')
+    parser.add_argument('--cpus', type=int, default=len(available_cpus()),
+                        help='Cores shared by the splits (default: all available)')
+    parser.add_argument('--feature-mode', default='embedding')
+    parser.add_argument('--pretrained', action='store_true',
+                        help='Download ImageNet weights instead of random init')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    processor = ImageProcessor(feature_mode=args.feature_mode, pretrained=args.pretrained)
+    image = synthetic_jpeg()
+
+    results = [benchmark_split(processor, image, None, 'unbounded', args.clients, args.requests)]
+    for workers, threads in splits(args.cpus):
+        execution = ExecutionConfig(max_concurrent_inferences=workers, intra_op_threads=threads)
+        results.append(benchmark_split(processor, image, execution, f'{workers}x{threads}',
+                                       args.clients, args.requests))
+
+    print(f"{args.clients} clients, {args.requests} requests, {args.cpus} cores")
+    print(f"{'split':<12}{'workers':>8}{'threads':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['split']:<12}{r['workers']:>8}{r['threads']:>8}{r['throughput_per_s']:>10.2f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,12 @@
-from flask import Flask, request, render_template, jsonify, send_from_directory
+from flask import Flask, request, render_template, jsonify, send_from_directory, g, Response
+import atexit
 import torch
 import pandas as pd
+import numpy as np
 import os
-from werkzeug.utils import secure_filename
 import json
+import time
+import uuid
 
 import sys
 import os
@@ -14,22 +17,160 @@ sys.path.append('../..')
 from src.processors.image_processor import ImageProcessor
 from src.processors.audio_processor import AudioProcessor
 from src.processors.data_integrator import DataIntegrator
+from src.processors.batch_ingestor import extract_image_batch, extract_audio_batch
 from src.utils.math_analyzer import MathAnalyzer
 from src.utils.graph_analyzer import GraphAnalyzer
+from src.utils.feature_cache import FeatureCache
+from src.utils.feature_store import FeatureStore
+from src.utils.job_queue import BatchingJobQueue, QueueFullError, QueueClosedError
+from src.utils.uploads import UploadStore
+from src.utils.process_pool import IsolatedProcessPool, PoolBusyError
+from src.utils.metrics import REGISTRY, stage
+from src.utils.metadata_encoder import MetadataEncoder
+from src.utils.execution import ExecutionConfig, affinity_from_environment
+from src.utils.profiler import SamplingProfiler, write_collapsed
 
 app = Flask(__name__, template_folder='../src/templates', static_folder='../src/static')
 app.config['UPLOAD_FOLDER'] = '../src/static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['PERSIST_UPLOADS'] = False  # uploads are processed from memory
+app.config['UPLOAD_MAX_AGE_SECONDS'] = 24 * 3600
+app.config['UPLOAD_MAX_BYTES'] = 1024 * 1024 * 1024  # 1GB in UPLOAD_FOLDER
+app.config['FEATURE_CACHE_FOLDER'] = '../.cache/features'
+app.config['FEATURE_CACHE_MAX_BYTES'] = 2 * 1024 * 1024 * 1024  # 2GB on disk
+app.config['FEATURE_STORE_FOLDER'] = '../.cache/store'  # extracted vectors, by item id
+app.config['PERSIST_FEATURES'] = True
+app.config['MODEL_WEIGHTS_FOLDER'] = '../.cache/weights'
+app.config['MODEL_WARMUP'] = True  # load models in the background at startup
+app.config['INFERENCE_PROFILE'] = 'fp32'  # 'cpu': int8 Linear, channels-last, TorchScript
+app.config['MAX_COSINE_DRIFT'] = 0.01  # optimized models must stay this close to fp32
+app.config['MAX_CONCURRENT_INFERENCES'] = 2  # forward passes at once; None for no limit
+app.config['TORCH_INTRA_OP_THREADS'] = None  # per forward pass; None splits the cores evenly
+app.config['TORCH_INTER_OP_THREADS'] = 1
+app.config['MODEL_THREADS'] = {}  # per-model overrides, e.g. {'audio': 2}
+app.config['MODEL_CONCURRENCY'] = {}  # per-model limits, e.g. {'image': 1}
+# CPUs of this server process: CPU_AFFINITY=0-3, or WORKER_COUNT=4 and
+# WORKER_INDEX=0..3 for an even share of the cores per server process
+app.config['CPU_AFFINITY'] = affinity_from_environment()
+app.config['GRAPH_CORRELATION_THRESHOLD'] = 0.5  # /api/graph links features above this
+app.config['METADATA_HASH_BUCKETS'] = 1 << 20  # codes per categorical metadata field
+app.config['JOB_QUEUE_MAX_SIZE'] = 64  # queued jobs before /api/jobs answers 429
+app.config['JOB_BATCH_SIZE'] = 8
+app.config['JOB_BATCH_WAIT_SECONDS'] = 0.05
+app.config['JOB_WORKERS'] = 1
+app.config['MATH_WORKERS'] = 2  # processes for integrate/simplify/solve
+app.config['MATH_MAX_PENDING'] = 8  # requests waiting for a math worker before 503
+app.config['MATH_TIMEOUT_SECONDS'] = 10.0  # per expression, across its symbolic steps
+app.config['PROFILE_SLOW_REQUESTS'] = False  # sample stacks of every request (opt-in)
+app.config['SLOW_REQUEST_SECONDS'] = 2.0  # profiles of slower requests are kept
+app.config['PROFILE_FOLDER'] = '../.cache/profiles'
+app.config['PROFILE_INTERVAL_SECONDS'] = 0.005
 
-# Create upload directory
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Thread budgets and affinity are inherited by threads and processes
+# started later, so apply them first
+execution = ExecutionConfig(
+    max_concurrent_inferences=app.config['MAX_CONCURRENT_INFERENCES'],
+    intra_op_threads=app.config['TORCH_INTRA_OP_THREADS'],
+    inter_op_threads=app.config['TORCH_INTER_OP_THREADS'],
+    model_threads=app.config['MODEL_THREADS'],
+    model_concurrency=app.config['MODEL_CONCURRENCY'],
+    cpu_affinity=app.config['CPU_AFFINITY']
+).apply()
+
+# Create upload directory; the store prunes it by age and total size
+upload_store = UploadStore(
+    app.config['UPLOAD_FOLDER'],
+    max_age_seconds=app.config['UPLOAD_MAX_AGE_SECONDS'],
+    max_total_bytes=app.config['UPLOAD_MAX_BYTES']
+)
+
+# Symbolic math runs in worker processes that can be killed on timeout.
+# They start from a forkserver, so the threads of this server are not
+# copied into them.
+math_pool = IsolatedProcessPool(
+    num_workers=app.config['MATH_WORKERS'],
+    max_pending=app.config['MATH_MAX_PENDING']
+)
 
 # Initialize processors
-image_processor = ImageProcessor()
-audio_processor = AudioProcessor()
-data_integrator = DataIntegrator()
-math_analyzer = MathAnalyzer()
+feature_cache = FeatureCache(
+    disk_dir=app.config['FEATURE_CACHE_FOLDER'],
+    max_disk_bytes=app.config['FEATURE_CACHE_MAX_BYTES']
+)
+# Models load lazily so the server answers /health immediately; warm-up
+# threads load both in parallel instead of on the first request.
+image_processor = ImageProcessor(
+    cache=feature_cache, lazy=True,
+    weights_cache_dir=app.config['MODEL_WEIGHTS_FOLDER'],
+    inference_profile=app.config['INFERENCE_PROFILE'],
+    max_cosine_drift=app.config['MAX_COSINE_DRIFT'],
+    execution=execution
+)
+audio_processor = AudioProcessor(
+    cache=feature_cache, lazy=True,
+    weights_cache_dir=app.config['MODEL_WEIGHTS_FOLDER'],
+    inference_profile=app.config['INFERENCE_PROFILE'],
+    max_cosine_drift=app.config['MAX_COSINE_DRIFT'],
+    execution=execution
+)
+if app.config['MODEL_WARMUP']:
+    warmup_threads = [t for t in (image_processor.warm_up(), audio_processor.warm_up()) if t]
+    # Exiting while a model is mid-load aborts the interpreter; let it finish
+    atexit.register(lambda: [thread.join() for thread in warmup_threads])
+data_integrator = DataIntegrator(
+    metadata_encoder=MetadataEncoder(num_buckets=app.config['METADATA_HASH_BUCKETS'])
+)
+# One append-only store per embedding: image and audio (channel mean).
+# Combined vectors are not stored: their width follows the metadata fields
+# of each request, and a store keeps the width of its first vector.
+feature_stores = {
+    name: FeatureStore(os.path.join(app.config['FEATURE_STORE_FOLDER'], name))
+    for name in ('image', 'audio')
+} if app.config['PERSIST_FEATURES'] else {}
+math_analyzer = MathAnalyzer(pool=math_pool, timeout=app.config['MATH_TIMEOUT_SECONDS'])
 graph_analyzer = GraphAnalyzer()
+profiler = SamplingProfiler(interval=app.config['PROFILE_INTERVAL_SECONDS'])
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    if app.config['PROFILE_SLOW_REQUESTS']:
+        g.profiled_thread = profiler.start()
+
+
+@app.after_request
+def _record_request(response):
+    """Record request latency and keep the stack profile of slow requests."""
+    elapsed = time.perf_counter() - g.pop('request_start', time.perf_counter())
+    endpoint = request.endpoint or 'unmatched'
+    REGISTRY.histogram('http_request_duration_seconds', {'endpoint': endpoint},
+                       'Request latency by endpoint').observe(elapsed)
+    REGISTRY.inc('http_requests_total', labels={'endpoint': endpoint, 'status': response.status_code},
+                 help_text='Requests by endpoint and status code')
+    
+    thread_id = g.pop('profiled_thread', None)
+    if thread_id is not None:
+        stacks = profiler.stop(thread_id)
+        if elapsed >= app.config['SLOW_REQUEST_SECONDS'] and stacks:
+            path = os.path.join(
+                app.config['PROFILE_FOLDER'],
+                f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{int(elapsed * 1000)}ms.folded"
+            )
+            try:
+                write_collapsed(stacks, path)
+                print(f"⚠️ Slow request to {endpoint} ({elapsed:.2f}s), profile written to {path}")
+            except OSError as e:
+                print(f"⚠️ Could not write request profile: {e}")
+    return response
+
+
+@app.teardown_request
+def _stop_profiling(exc):
+    # after_request is skipped when a request fails; stop sampling anyway
+    thread_id = g.pop('profiled_thread', None)
+    if thread_id is not None:
+        profiler.stop(thread_id)
 
 
 @app.route('/')
@@ -38,6 +179,162 @@ def dashboard():
     return render_template('dashboard.html')
 
 
+def _read_upload(field):
+    """
+    Read an uploaded file into memory; returns its bytes or None.
+    
+    With PERSIST_UPLOADS the bytes are also written to UPLOAD_FOLDER in
+    the background; processing never waits on that copy.
+    """
+    upload = request.files.get(field)
+    if upload is None or not upload.filename:
+        return None
+    with stage('upload_read'):
+        data = upload.read()
+    if app.config['PERSIST_UPLOADS']:
+        upload_store.save(data, upload.filename)
+    return data
+
+
+def _read_payload():
+    """Collect the uploads and metadata of an analysis request."""
+    return {
+        'image': _read_upload('image'),
+        'audio': _read_upload('audio'),
+        'metadata': _parse_metadata()
+    }
+
+
+def _parse_metadata():
+    """Read the optional metadata form field as a dict."""
+    metadata = {}
+    if request.form.get('metadata'):
+        try:
+            metadata = json.loads(request.form.get('metadata'))
+        except:
+            metadata = {'metadata': request.form.get('metadata')}
+    # Remove the request.json check that was causing the 415 error
+    return metadata
+
+
+def _store_features(name, item_id, features):
+    """Append one item's vector to a feature store; returns an error message or None."""
+    store = feature_stores.get(name)
+    if store is None:
+        return None
+    if isinstance(features, torch.Tensor):
+        features = features.detach().cpu().numpy()
+    features = np.asarray(features, dtype=np.float32)
+    try:
+        # One row per item: average per-channel audio features
+        with stage('feature_store_append'):
+            store.append([item_id], features.reshape(-1, features.shape[-1]).mean(axis=0))
+    except (OSError, ValueError) as e:
+        return f"Feature store error ({name}): {str(e)}"
+    return None
+
+
+def analyze_batch(payloads):
+    """
+    Run the multi-modal analysis for several uploads at once.
+    
+    Images and audio from all payloads go through the models as
+    micro-batches; integration and graph updates then run per item.
+    Each item gets an id under which its vectors are kept in the
+    feature stores.
+    
+    Args:
+        payloads: List of dicts with 'image' and 'audio' (bytes, paths or
+            None) and 'metadata'
+        
+    Returns:
+        List of result dicts, one per payload, as returned by /api/analyze
+    """
+    results = [{
+        'item_id': f"upload_{uuid.uuid4().hex[:12]}",
+        'status': 'processing',
+        'image_features': None,
+        'audio_features': None,
+        'integrated_data': None,
+        'errors': []
+    } for _ in payloads]
+    image_features = [None] * len(payloads)
+    audio_features = [None] * len(payloads)
+    
+    image_items = [i for i, p in enumerate(payloads) if p.get('image')]
+    if image_items:
+        extracted = extract_image_batch(image_processor, [payloads[i]['image'] for i in image_items])
+        for i, features in zip(image_items, extracted):
+            if isinstance(features, Exception):
+                results[i]['errors'].append(f"Image processing error: {str(features)}")
+                continue
+            image_features[i] = features
+            error = _store_features('image', results[i]['item_id'], features)
+            if error:
+                results[i]['errors'].append(error)
+            results[i]['image_features'] = {
+                'shape': list(features.shape),
+                'sample': features.flatten()[:10].tolist()
+            }
+    
+    audio_items = [i for i, p in enumerate(payloads) if p.get('audio')]
+    if audio_items:
+        extracted = extract_audio_batch(audio_processor, [payloads[i]['audio'] for i in audio_items])
+        for i, features in zip(audio_items, extracted):
+            if isinstance(features, Exception):
+                results[i]['errors'].append(f"Audio processing error: {str(features)}")
+                continue
+            audio_features[i] = features
+            error = _store_features('audio', results[i]['item_id'], features)
+            if error:
+                results[i]['errors'].append(error)
+            results[i]['audio_features'] = {
+                'shape': list(features.shape) if hasattr(features, 'shape') else len(features),
+                'sample': features.flatten()[:10].tolist() if hasattr(features, 'flatten') else str(features)[:100]
+            }
+    
+    for i, payload in enumerate(payloads):
+        result = results[i]
+        # Combine modalities if we have data
+        if image_features[i] is not None and audio_features[i] is not None:
+            try:
+                metadata_df = pd.DataFrame([payload.get('metadata') or {}])
+                integrated = data_integrator.combine_modalities(
+                    image_features[i], audio_features[i], metadata_df
+                )
+                result['integrated_data'] = {
+                    'shape': list(integrated.shape),
+                    'feature_count': integrated.shape[1]
+                }
+            except Exception as e:
+                result['errors'].append(f"Integration error: {str(e)}")
+            
+            # Link this item into the live relationship graph by its
+            # embeddings; the combined width depends on the metadata sent
+            item_id = result['item_id']
+            try:
+                with stage('live_graph_update'):
+                    graph_update = data_integrator.update_live_graph(
+                        data_integrator.embedding_vector(image_features[i], audio_features[i]),
+                        [item_id]
+                    )
+                result['relationship_graph'] = dict(graph_update, item_id=item_id)
+            except ValueError as e:
+                result['errors'].append(f"Relationship graph error: {str(e)}")
+        result['status'] = 'completed'
+    
+    return results
+
+
+job_queue = BatchingJobQueue(
+    analyze_batch,
+    max_batch_size=app.config['JOB_BATCH_SIZE'],
+    max_wait_seconds=app.config['JOB_BATCH_WAIT_SECONDS'],
+    num_workers=app.config['JOB_WORKERS'],
+    max_queue_size=app.config['JOB_QUEUE_MAX_SIZE']
+)
+
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_multimodal():
     """Analyze multi-modal data (image + audio + metadata)."""
@@ -45,83 +342,42 @@ def analyze_multimodal():
         print(f"DEBUG: Request content type: {request.content_type}")
         print(f"DEBUG: Request files: {list(request.files.keys())}")
         print(f"DEBUG: Request form: {list(request.form.keys())}")
-        results = {
-            'status': 'processing',
-            'image_features': None,
-            'audio_features': None,
-            'integrated_data': None,
-            'errors': []
-        }
-        
-        # Handle image file upload
-        if 'image' in request.files:
-            image_file = request.files['image']
-            if image_file.filename:
-                filename = secure_filename(image_file.filename)
-                image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                image_file.save(image_path)
-                
-                try:
-                    image_features = image_processor.process_image(image_path)
-                    results['image_features'] = {
-                        'shape': list(image_features.shape),
-                        'sample': image_features.flatten()[:10].tolist()
-                    }
-                except Exception as e:
-                    results['errors'].append(f"Image processing error: {str(e)}")
-        
-        # Handle audio file upload
-        if 'audio' in request.files:
-            audio_file = request.files['audio']
-            if audio_file.filename:
-                filename = secure_filename(audio_file.filename)
-                audio_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                audio_file.save(audio_path)
-                
-                try:
-                    audio_features = audio_processor.extract_features(audio_path)
-                    results['audio_features'] = {
-                        'shape': list(audio_features.shape) if hasattr(audio_features, 'shape') else len(audio_features),
-                        'sample': audio_features.flatten()[:10].tolist() if hasattr(audio_features, 'flatten') else str(audio_features)[:100]
-                    }
-                except Exception as e:
-                    results['errors'].append(f"Audio processing error: {str(e)}")
+        return jsonify(analyze_batch([_read_payload()])[0])
         
-        # Handle metadata
-        metadata = {}
-        if request.form.get('metadata'):
-            try:
-                metadata = json.loads(request.form.get('metadata'))
-            except:
-                metadata = {'metadata': request.form.get('metadata')}
-        # Remove the request.json check that was causing the 415 error
-        
-        # Combine modalities if we have data
-        if results['image_features'] or results['audio_features']:
-            try:
-                # Create sample data for integration
-                img_features = image_features if results['image_features'] else None
-                aud_features = audio_features if results['audio_features'] else None
-                
-                if img_features is not None and aud_features is not None:
-                    metadata_df = pd.DataFrame([metadata])
-                    integrated = data_integrator.combine_modalities(
-                        img_features, aud_features, metadata_df
-                    )
-                    results['integrated_data'] = {
-                        'shape': list(integrated.shape),
-                        'feature_count': integrated.shape[1]
-                    }
-            except Exception as e:
-                results['errors'].append(f"Integration error: {str(e)}")
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a multi-modal analysis and return a job id to poll."""
+    try:
+        try:
+            job = job_queue.submit(_read_payload())
+        except (QueueFullError, QueueClosedError) as e:
+            status_code = 429 if isinstance(e, QueueFullError) else 503
+            response = jsonify({'status': 'error', 'message': str(e)})
+            response.headers['Retry-After'] = '1'
+            return response, status_code
         
-        results['status'] = 'completed'
-        return jsonify(results)
+        status_url = f"/api/jobs/{job.id}"
+        response = jsonify({'job_id': job.id, 'status': job.status, 'status_url': status_url})
+        response.headers['Location'] = status_url
+        return response, 202
         
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status of a queued analysis, with its result once completed."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f"Unknown job: {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+
 @app.route('/api/math', methods=['POST'])
 def analyze_math():
     """Perform symbolic mathematical analysis."""
@@ -140,6 +396,10 @@ def analyze_math():
         result = math_analyzer.symbolic_analysis(expression)
         return jsonify(result)
         
+    except PoolBusyError as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -156,7 +416,9 @@ def analyze_graph():
         # Expect CSV-like data or JSON array
         if 'data' in data:
             df = pd.DataFrame(data['data'])
-            result = graph_analyzer.analyze_relationships(df)
+            result = graph_analyzer.analyze_relationships(
+                df, threshold=app.config['GRAPH_CORRELATION_THRESHOLD']
+            )
             return jsonify(result)
         else:
             return jsonify({'error': 'No data provided'}), 400
@@ -165,25 +427,63 @@ def analyze_graph():
         return jsonify({'error': str(e)}), 500
 
 
+def _model_metrics(processor):
+    status = processor.model_status()
+    return {'ready': status['state'] == 'ready', 'load_seconds': status['load_seconds']}
+
+
+# Gauges exported on /metrics, read from the same stats as /health
+REGISTRY.register_collector('feature_cache', feature_cache.stats)
+REGISTRY.register_collector('job_queue', job_queue.stats)
+REGISTRY.register_collector('uploads', upload_store.stats)
+REGISTRY.register_collector('math_pool', math_pool.stats)
+REGISTRY.register_collector('execution', execution.stats)
+for _name, _store in feature_stores.items():
+    REGISTRY.register_collector('feature_store', _store.stats, labels={'store': _name})
+for _name, _processor in (('image', image_processor), ('audio', audio_processor)):
+    REGISTRY.register_collector('model', lambda processor=_processor: _model_metrics(processor),
+                                labels={'model': _name})
+
+
+@app.route('/metrics')
+def metrics():
+    """Stage and request latency histograms plus service gauges, for Prometheus."""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/health')
 def health():
     """Health check endpoint."""
     return jsonify({
         'status': 'healthy',
         'processors': {
-            'image': 'ready',
-            'audio': 'ready',
+            'image': image_processor.model_status()['state'],
+            'audio': audio_processor.model_status()['state'],
             'data_integrator': 'ready'
-        }
+        },
+        'models': {
+            'image': image_processor.model_status(),
+            'audio': audio_processor.model_status()
+        },
+        'feature_cache': feature_cache.stats(),
+        'feature_store': {name: store.stats() for name, store in feature_stores.items()},
+        'job_queue': job_queue.stats(),
+        'uploads': upload_store.stats(),
+        'math_pool': math_pool.stats(),
+        'execution': execution.stats()
     })
 
 
-if __name__ == '__main__':
+def serve(host='0.0.0.0', port=5000, debug=True):
+    """Run the web server."""
     print("="*70)
     print("AI-Powered Multi-Modal Analytics Platform")
     print("="*70)
     print("Starting server...")
-    print("Access the dashboard at: http://127.0.0.1:5000")
+    print(f"Access the dashboard at: http://127.0.0.1:{port}")
     print("="*70)
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=debug, host=host, port=port)
+
 
+if __name__ == '__main__':
+    serve()
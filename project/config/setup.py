@@ -3,7 +3,7 @@
 Setup script for Advanced Multi-Modal Computational Analytics Platform.
 """
 
-from setuptools import setup, find_packages
+from setuptools import setup, find_namespace_packages
 import os
 
 def read_requirements():
@@ -30,8 +30,9 @@ setup(
         "Documentation": "https://github.com/yourusername/multimodal-analytics-platform/wiki",
         "Source Code": "https://github.com/yourusername/multimodal-analytics-platform",
     },
-    packages=find_packages(where="src"),
-    package_dir={"": "src"},
+    # The code imports itself as the src package (src.processors, src.utils)
+    packages=find_namespace_packages(where="..", include=["src", "src.*"]),
+    package_dir={"": ".."},
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Science/Research",
@@ -67,7 +68,7 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "multimodal-platform=app:main",
+            "multimodal-platform=src.cli:main",
         ],
     },
     include_package_data=True,
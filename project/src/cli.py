@@ -0,0 +1,137 @@
+"""
+Command line entry point of the multimodal-platform console script.
+
+    multimodal-platform serve [--host H] [--port P] [--no-debug]
+    multimodal-platform ingest SOURCE --output DIR [options]
+
+From a source checkout, run it as `python -m src.cli` in the project
+directory. 'ingest' builds only the processors it needs; 'serve' imports
+the web application in config/app.py, which sets up the full server.
+"""
+
+import argparse
+import os
+import sys
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_DIR = os.path.join(PROJECT_DIR, 'config')
+DEFAULT_WEIGHTS_DIR = os.path.join(PROJECT_DIR, '.cache', 'weights')
+
+
+def serve(host='0.0.0.0', port=5000, debug=True):
+    """Run the web server from config/app.py."""
+    if not os.path.exists(os.path.join(CONFIG_DIR, 'app.py')):
+        raise OSError(f"Web application not found in {CONFIG_DIR}; "
+                      f"'serve' needs a source checkout of the project")
+    # The app resolves its folders relative to config/; the debug reloader
+    # restarts this command from there, so keep the project importable
+    os.chdir(CONFIG_DIR)
+    sys.path.insert(0, CONFIG_DIR)
+    os.environ['PYTHONPATH'] = os.pathsep.join(
+        [PROJECT_DIR] + [p for p in os.environ.get('PYTHONPATH', '').split(os.pathsep) if p])
+    import app as web_app
+    web_app.serve(host=host, port=port, debug=debug)
+
+
+def ingest(source, output_dir, shard_size=1024, batch_size=None, num_workers=None,
+           resume=True, images=True, audio=True, inference_profile='fp32',
+           weights_cache_dir=DEFAULT_WEIGHTS_DIR):
+    """
+    Extract features for a directory or JSON manifest into shards.
+
+    Args:
+        source: Directory of media files, or a manifest like
+            samples/combined/test_batch_1.json
+        output_dir: Directory for shards and the resume checkpoint
+        shard_size: Samples per shard
+        batch_size: Inference batch size (processor default if None)
+        num_workers: Decode threads (processor default if None)
+        resume: Continue from an existing checkpoint
+        images, audio: Which modalities to extract
+        inference_profile: Inference profile of both models (see utils.cpu_inference)
+        weights_cache_dir: Local copy of the pretrained weights
+
+    Returns:
+        The final checkpoint dict
+    """
+    from .processors.batch_ingestor import BatchIngestor, iter_directory, iter_manifest
+
+    samples = iter_directory(source) if os.path.isdir(source) else iter_manifest(source)
+    options = {'weights_cache_dir': weights_cache_dir, 'inference_profile': inference_profile}
+    if batch_size:
+        options['batch_size'] = batch_size
+    if num_workers:
+        options['num_workers'] = num_workers
+
+    # Ingestion is the only caller, so the models keep torch's default of
+    # one intra-op thread per core
+    image_processor = audio_processor = None
+    if images:
+        from .processors.image_processor import ImageProcessor
+        image_processor = ImageProcessor(**options)
+    if audio:
+        from .processors.audio_processor import AudioProcessor
+        audio_processor = AudioProcessor(**options)
+
+    ingestor = BatchIngestor(
+        output_dir,
+        image_processor=image_processor,
+        audio_processor=audio_processor,
+        shard_size=shard_size
+    )
+
+    def report(state):
+        rate = state['samples'] / state['elapsed_seconds'] if state['elapsed_seconds'] else 0.0
+        print(f"📦 shard {state['shards']:5d}  samples {state['samples']:9d}  "
+              f"errors {state['errors']:6d}  {rate:8.1f} samples/s")
+
+    state = ingestor.run(samples, source=os.path.abspath(source), resume=resume, progress=report)
+    print(f"✅ Ingested {state['samples']} samples into {state['shards']} shards in {output_dir}")
+    return state
+
+
+def main(argv=None):
+    """Command line entry point: 'serve' (default) or 'ingest'."""
+    parser = argparse.ArgumentParser(prog='multimodal-platform',
+                                     description="AI-Powered Multi-Modal Analytics Platform")
+    commands = parser.add_subparsers(dest='command')
+
+    serve_parser = commands.add_parser('serve', help="Run the web server (default)")
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=5000)
+    serve_parser.add_argument('--no-debug', action='store_true', help="Disable Flask debug mode")
+
+    ingest_parser = commands.add_parser('ingest', help="Extract features for a directory or manifest")
+    ingest_parser.add_argument('source', help="Directory of media files or JSON manifest")
+    ingest_parser.add_argument('--output', '-o', required=True, help="Directory for shards and checkpoint")
+    ingest_parser.add_argument('--shard-size', type=int, default=1024)
+    ingest_parser.add_argument('--batch-size', type=int, default=None)
+    ingest_parser.add_argument('--workers', type=int, default=None, help="Decode threads")
+    ingest_parser.add_argument('--no-resume', action='store_true', help="Ignore an existing checkpoint")
+    ingest_parser.add_argument('--skip-images', action='store_true')
+    ingest_parser.add_argument('--skip-audio', action='store_true')
+    ingest_parser.add_argument('--inference-profile', default='fp32',
+                               help="'fp32', 'cpu' or 'cpu_fp32'")
+    ingest_parser.add_argument('--weights-cache', default=DEFAULT_WEIGHTS_DIR,
+                               help="Directory for a local copy of the pretrained weights")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'ingest':
+            ingest(args.source, args.output, shard_size=args.shard_size,
+                   batch_size=args.batch_size, num_workers=args.workers,
+                   resume=not args.no_resume, images=not args.skip_images,
+                   audio=not args.skip_audio, inference_profile=args.inference_profile,
+                   weights_cache_dir=args.weights_cache)
+        elif args.command == 'serve':
+            serve(host=args.host, port=args.port, debug=not args.no_debug)
+        else:
+            serve()
+    except (OSError, ValueError) as e:
+        parser.exit(1, f"❌ {e}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Sample dtype and the (offset, scale) that maps raw values to [-1, 1],
+# matching torchaudio's normalization of integer PCM.
+_SAMPLE_FORMATS = {
+    (WAVE_FORMAT_PCM, 8): (np.uint8, 128.0, 1 / 128.0),
+    (WAVE_FORMAT_PCM, 16): (np.dtype('<i2'), 0.0, 1 / 32768.0),
+    (WAVE_FORMAT_PCM, 32): (np.dtype('<i4'), 0.0, 1 / 2147483648.0),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): (np.dtype('<f4'), 0.0, 1.0),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): (np.dtype('<f8'), 0.0, 1.0),
+}
+
+# Raw interleaved samples (frames x channels) plus what is needed to
+# normalize them. samples is a memory map or a view of the caller's buffer.
+WavData = namedtuple('WavData', ['samples', 'sample_rate', 'offset', 'scale'])
+
+
+def _parse_header(header):
+    """Return (format_key, channels, sample_rate, data_offset, data_size) or None."""
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+
+    position = 12
+    fmt = None
+    while position + 8 <= len(header):
+        chunk_id = header[position:position + 4]
+        chunk_size = struct.unpack('<I', header[position + 4:position + 8])[0]
+        body = position + 8
+        if chunk_id == b'fmt ':
+            audio_format, channels, sample_rate = struct.unpack('<HHI', header[body:body + 8])
+            bits = struct.unpack('<H', header[body + 14:body + 16])[0]
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # First two bytes of the SubFormat GUID hold the real format
+                audio_format = struct.unpack('<H', header[body + 24:body + 26])[0]
+            fmt = ((audio_format, bits), channels, sample_rate)
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            return fmt + (body, chunk_size)
+        position = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def open_wav(source, header_bytes=64 * 1024):
+    """
+    Map the sample data of a PCM or float WAV file without decoding it.
+
+    Args:
+        source: Path, bytes-like object or seekable file-like object
+        header_bytes: How much of the file to scan for the fmt/data chunks
+
+    Returns:
+        WavData, or None if the source is not a WAV layout this reader
+        handles (compressed formats, 24-bit PCM, ...)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            header = f.read(header_bytes)
+        buffer = None
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        buffer = source
+        header = bytes(buffer[:header_bytes])
+    else:
+        position = source.tell()
+        buffer = source.read()
+        source.seek(position)
+        header = buffer[:header_bytes]
+
+    parsed = _parse_header(header)
+    if parsed is None:
+        return None
+    format_key, channels, sample_rate, data_offset, data_size = parsed
+    if format_key not in _SAMPLE_FORMATS or channels == 0:
+        return None
+    dtype, offset, scale = _SAMPLE_FORMATS[format_key]
+    dtype = np.dtype(dtype)
+
+    if buffer is None:
+        available = os.path.getsize(source) - data_offset
+    else:
+        available = len(buffer) - data_offset
+    frames = min(data_size, available) // (dtype.itemsize * channels)
+    if frames == 0:
+        samples = np.zeros((0, channels), dtype=dtype)
+    elif buffer is None:
+        samples = np.memmap(source, dtype=dtype, mode='r', offset=data_offset,
+                            shape=(frames, channels))
+    else:
+        samples = np.frombuffer(buffer, dtype=dtype, count=frames * channels,
+                                offset=data_offset).reshape(frames, channels)
+    return WavData(samples, sample_rate, offset, scale)
+
+
+def iter_chunks(wav, chunk_frames=1 << 16):
+    """
+    Yield normalized float32 blocks of a WavData, shaped (frames, channels).
+
+    Only one block is materialized at a time.
+    """
+    for start in range(0, len(wav.samples), chunk_frames):
+        block = wav.samples[start:start + chunk_frames].astype(np.float32)
+        if wav.offset:
+            block -= wav.offset
+        if wav.scale != 1.0:
+            block *= wav.scale
+        yield block
@@ -1,3 +1,9 @@
+import math
+import os
+from collections import namedtuple
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
 import torch
 import pandas as pd
 import numpy as np
@@ -8,34 +14,159 @@ except ImportError:
     TORCHAUDIO_AVAILABLE = False
     print("Warning: torchaudio not available, using basic audio processing")
 
+from .audio_io import open_wav, iter_chunks
+from ..utils.running_stats import RunningMoments
+from ..utils.cpu_inference import (DEFAULT_MAX_COSINE_DRIFT, apply_profile, profile_options,
+                                   quantize_linear)
+from ..utils.metrics import stage
+from ..utils.model_loader import LazyModel, load_with_weight_cache
+from ..utils.uploads import as_stream
+
+
+# Wav2Vec2's convolutional front end sees 400 samples per frame and
+# advances 320 samples (20 ms at 16 kHz) between frames.
+WAV2VEC2_RECEPTIVE_FIELD = 400
+WAV2VEC2_FRAME_STRIDE = 320
+DEFAULT_WINDOW_SECONDS = 30.0
+
+# One streaming window: time span in seconds, time-mean embedding of the
+# frames it contributes (channels x dim) and how many frames that was.
+WindowFeatures = namedtuple('WindowFeatures', ['start', 'end', 'features', 'num_frames'])
+
+# Waveform summary returned by extract_statistical_features(as_series=False)
+AudioStatistics = namedtuple('AudioStatistics', ['mean', 'std', 'max', 'min', 'duration'])
+STATS_CHUNK_FRAMES = 1 << 16
+
 
 class AudioProcessor:
-    def __init__(self):
-        """Initialize audio processor with fallback for missing dependencies."""
+    def __init__(self, cache=None, window_seconds=None, overlap_seconds=1.0,
+                 batch_size=8, num_workers=4, lazy=False, weights_cache_dir=None,
+                 pretrained=True, inference_profile='fp32',
+                 max_cosine_drift=DEFAULT_MAX_COSINE_DRIFT, execution=None):
+        """
+        Initialize audio processor with fallback for missing dependencies.
+        
+        Args:
+            cache: Optional FeatureCache consulted by extract_features
+            window_seconds: If set, extract_features streams the file in
+                windows of this length instead of decoding it whole
+            overlap_seconds: Context shared by consecutive windows
+            batch_size: Default number of sequences per batch_extract batch
+            num_workers: Threads used by batch_extract to decode and resample
+            lazy: Defer loading Wav2Vec2 until first use (or warm_up)
+            weights_cache_dir: Directory for a local copy of the pretrained
+                weights, memory-mapped on later starts
+            pretrained: Load the pretrained WAV2VEC2_BASE weights (False
+                gives a random-init model of the same architecture,
+                useful offline)
+            inference_profile: 'fp32', or 'cpu' to run the transformer's
+                Linear layers in int8 (see utils.cpu_inference)
+            max_cosine_drift: Largest 1 - cosine similarity to the fp32
+                output accepted from an optimized model
+            execution: Optional ExecutionConfig bounding concurrent forward
+                passes and their threads (see utils.execution)
+        """
+        profile_options(inference_profile)
         self.sample_rate = 16000
+        self.pretrained = pretrained
+        self.inference_profile = inference_profile
+        self.max_cosine_drift = max_cosine_drift
+        self.inference_report = None
+        self.execution = execution
         self.torchaudio_available = TORCHAUDIO_AVAILABLE
+        self.cache = cache
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.weights_cache_dir = weights_cache_dir
         
         if TORCHAUDIO_AVAILABLE:
-            try:
-                self.bundle = torchaudio.pipelines.WAV2VEC2_BASE
-                self.model = self.bundle.get_model()
-                self.model.eval()
-                self.sample_rate = self.bundle.sample_rate
-                print("✅ Wav2Vec2 model loaded successfully")
-            except Exception as e:
-                print(f"Warning: Could not load Wav2Vec2, using fallback: {e}")
-                self.bundle = None
-                self.model = None
+            self.bundle = torchaudio.pipelines.WAV2VEC2_BASE
+            self.sample_rate = self.bundle.sample_rate
         else:
             self.bundle = None
-            self.model = None
+        
+        self._model_handle = LazyModel('audio', self._load_model)
+        if not lazy:
+            self._model_handle.get()
+    
+    @property
+    def model(self):
+        """Wav2Vec2, loaded on first access when lazy; None if unavailable."""
+        return self._model_handle.get()
+    
+    def warm_up(self):
+        """Load the model on a background thread; returns the thread."""
+        return self._model_handle.warm_up()
+    
+    def model_status(self):
+        """Load state of the model and its inference profile, for health reporting."""
+        return dict(self._model_handle.status(), inference_profile=self.inference_profile,
+                    inference=self.inference_report)
+    
+    def _invoke(self):
+        """Slot and thread budget for one forward pass."""
+        if self.execution is None:
+            return nullcontext()
+        return self.execution.invoke('audio')
+    
+    def _load_model(self):
+        """Load Wav2Vec2, via the weight cache when enabled; None on failure."""
+        if self.bundle is None:
+            return None
+        try:
+            if not self.pretrained:
+                model = torchaudio.models.wav2vec2_base()
+            elif self.weights_cache_dir:
+                model = load_with_weight_cache(
+                    torchaudio.models.wav2vec2_base,
+                    self.bundle.get_model,
+                    os.path.join(self.weights_cache_dir, 'wav2vec2_base.pt')
+                )
+            else:
+                model = self.bundle.get_model()
+            model.eval()
+            if self.inference_profile != 'fp32':
+                model = self._apply_inference_profile(model)
+            print("✅ Wav2Vec2 model loaded successfully")
+            return model
+        except Exception as e:
+            print(f"Warning: Could not load Wav2Vec2, using fallback: {e}")
+            return None
+    
+    def _apply_inference_profile(self, model):
+        """
+        Optimize Wav2Vec2 for CPU inference.
+        
+        Only quantization applies: the convolutional front end is 1-D, so
+        channels-last does not exist for it, and a frozen TorchScript graph
+        would keep forward only, not the feature_extractor and encoder
+        that batch_extract calls (scripting without freezing measured
+        slower than eager).
+        """
+        options = profile_options(self.inference_profile)
+        
+        def optimize(model):
+            if options['quantize']:
+                return quantize_linear(model), ['dynamic_int8_linear']
+            return model, []
+        
+        generator = torch.Generator().manual_seed(0)
+        examples = [torch.randn(2, self.sample_rate, generator=generator)]
+        model, self.inference_report = apply_profile(
+            'audio', model, optimize,
+            lambda m, x: m.extract_features(x, num_layers=1)[0][0].mean(dim=1),
+            examples, self.max_cosine_drift
+        )
+        return model
     
     def extract_features(self, audio_path):
         """
         Extract features from audio file.
         
         Args:
-            audio_path: Path to audio file or file-like object
+            audio_path: Path to audio file, bytes or file-like object
             
         Returns:
             torch tensor of extracted features
@@ -46,38 +177,286 @@ class AudioProcessor:
             return torch.randn(1, 512)  # Mock 512-dimensional features
         
         try:
-            waveform, sample_rate = torchaudio.load(audio_path)
-            
-            if self.model is None:
-                # Fallback: return basic statistical features as tensor
-                features = torch.tensor([
-                    waveform.mean().item(),
-                    waveform.std().item(),
-                    waveform.max().item(),
-                    waveform.min().item(),
-                    float(waveform.shape[1] / sample_rate)  # duration
-                ])
-                return features.unsqueeze(0)  # Add batch dimension
+            if self.cache is not None and self.model is not None:
+                features = self.cache.get_or_compute(
+                    audio_path, self.cache_namespace,
+                    lambda source: self._extract(source).numpy()
+                )
+                return torch.from_numpy(features.copy())
+            return self._extract(audio_path)
             
-            # Resample if necessary
-            if sample_rate != self.sample_rate:
+        except Exception as e:
+            print(f"⚠️ Audio processing error: {e}, using mock features")
+            return torch.randn(1, 512)  # Mock features as fallback
+    
+    @property
+    def cache_namespace(self):
+        """Identifies the model and preprocessing behind cached features."""
+        model_name = 'wav2vec2_base' if self.pretrained else 'wav2vec2_base-random'
+        if profile_options(self.inference_profile)['quantize']:
+            model_name += '+int8'
+        namespace = f"{model_name}:{self.sample_rate}:layer0-time-mean"
+        if self.window_seconds:
+            namespace += f":window={self.window_seconds}/{self.overlap_seconds}"
+        return namespace
+    
+    def _extract(self, audio_path):
+        """Decode audio and compute features, bypassing the cache."""
+        if self.window_seconds and self.model is not None:
+            return self._extract_streaming(audio_path)
+        
+        if self.model is None:
+            # Fallback: return basic statistical features as tensor
+            stats = self.compute_statistics(audio_path, ddof=1)
+            features = torch.tensor([stats.mean, stats.std, stats.max, stats.min, stats.duration])
+            return features.unsqueeze(0)  # Add batch dimension
+        
+        with stage('audio_decode'):
+            waveform, sample_rate = torchaudio.load(as_stream(audio_path))
+        return self._waveform_features(waveform, sample_rate)
+    
+    def _waveform_features(self, waveform, sample_rate):
+        """Resample a decoded waveform and return its time-mean embedding."""
+        # Resample if necessary
+        if sample_rate != self.sample_rate:
+            with stage('audio_resample'):
                 waveform = torchaudio.functional.resample(
                     waveform, sample_rate, self.sample_rate
                 )
+        
+        # Average over time dimension
+        return self._embed_frames(waveform).mean(dim=1)
+    
+    def _embed_frames(self, waveform):
+        """
+        Run Wav2Vec2 up to its first transformer layer.
+        
+        Args:
+            waveform: Tensor (channels, samples) at self.sample_rate
             
-            with torch.no_grad():
-                features, _ = self.model.extract_features(waveform)
-                # Average over time dimension
-                features = features[0].mean(dim=1)
+        Returns:
+            Tensor (channels, frames, dim) of first-layer outputs
+        """
+        model = self.model
+        with self._invoke(), stage('audio_forward'), torch.no_grad():
+            # Only the first layer is used, so skip the other eleven
+            features, _ = model.extract_features(waveform, num_layers=1)
+        return features[0]
+    
+    def _load_segment(self, audio_path, frame_offset, num_frames):
+        """Decode part of a file; file-like objects are rewound first."""
+        source = as_stream(audio_path)
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return torchaudio.load(source, frame_offset=frame_offset, num_frames=num_frames)
+    
+    def stream_features(self, audio_path, window_seconds=None, overlap_seconds=None):
+        """
+        Yield Wav2Vec2 embeddings for consecutive windows of a recording.
+        
+        Only one window is decoded, resampled and run through the model at a
+        time, so peak memory does not depend on the recording length. Each
+        window after the first starts overlap_seconds early to give the model
+        context; frames in that overlap that the previous window already
+        produced are dropped, so every frame position is counted once.
+        
+        Args:
+            audio_path: Path to audio file, bytes or seekable file-like object
+            window_seconds: Window length (defaults to the processor setting,
+                or 30 seconds)
+            overlap_seconds: Context shared by consecutive windows
+            
+        Yields:
+            WindowFeatures for each window
+        """
+        if self.model is None:
+            raise RuntimeError("Wav2Vec2 model is not loaded")
+        window_seconds = window_seconds or self.window_seconds or DEFAULT_WINDOW_SECONDS
+        if overlap_seconds is None:
+            overlap_seconds = self.overlap_seconds
+        
+        _, source_rate = self._load_segment(audio_path, 0, 1)
+        window = int(round(window_seconds * source_rate))
+        overlap = int(round(overlap_seconds * source_rate))
+        if not 0 <= overlap < window:
+            raise ValueError("overlap_seconds must be non-negative and shorter than window_seconds")
+        
+        hop_target = (window - overlap) * self.sample_rate / source_rate
+        
+        offset = 0
+        previous_frames = 0
+        while True:
+            chunk, _ = self._load_segment(audio_path, offset, window)
+            length = chunk.shape[1]
+            if length == 0:
+                break
             
-            return features
+            if source_rate != self.sample_rate:
+                chunk = torchaudio.functional.resample(chunk, source_rate, self.sample_rate)
+            if offset > 0 and chunk.shape[1] < WAV2VEC2_RECEPTIVE_FIELD:
+                break
             
+            frames = self._embed_frames(chunk)
+            total_frames = frames.shape[1]
+            if offset > 0:
+                # Skip frames whose start the previous window already covered
+                covered = previous_frames * WAV2VEC2_FRAME_STRIDE - hop_target
+                frames = frames[:, max(0, math.ceil(covered / WAV2VEC2_FRAME_STRIDE)):]
+            previous_frames = total_frames
+            if frames.shape[1]:
+                yield WindowFeatures(
+                    start=offset / source_rate,
+                    end=(offset + length) / source_rate,
+                    features=frames.mean(dim=1),
+                    num_frames=frames.shape[1]
+                )
+            
+            if length < window:
+                break
+            offset += window - overlap
+    
+    def _extract_streaming(self, audio_path):
+        """Combine per-window means into the time-mean over the whole file."""
+        total = None
+        count = 0
+        for window in self.stream_features(audio_path):
+            weighted = window.features * window.num_frames
+            total = weighted if total is None else total + weighted
+            count += window.num_frames
+        if total is None:
+            raise ValueError("Audio produced no frames")
+        return total / count
+    
+    def batch_extract(self, audio_paths, batch_size=None, num_workers=None):
+        """
+        Extract features for many clips with batched Wav2Vec2 inference.
+        
+        Clips are decoded and resampled on a thread pool, sorted by length
+        so each batch holds similar lengths (little padding), and run as
+        padded batches with valid lengths passed to the model. The time
+        mean is taken over valid frames only, so every result matches
+        extract_features for the same clip.
+        
+        Args:
+            audio_paths: Sequence of paths, bytes or file-like objects
+            batch_size: Sequences per forward pass (defaults to self.batch_size)
+            num_workers: Decode threads (defaults to self.num_workers)
+            
+        Returns:
+            List of torch tensors, one per clip, shaped like extract_features
+        """
+        audio_paths = list(audio_paths)
+        if not self.torchaudio_available or self.model is None:
+            return [self.extract_features(path) for path in audio_paths]
+        batch_size = max(1, batch_size or self.batch_size)
+        num_workers = num_workers or self.num_workers
+        
+        results = [None] * len(audio_paths)
+        keys = [None] * len(audio_paths)
+        pending = []
+        for i, path in enumerate(audio_paths):
+            if self.cache is not None:
+                keys[i] = self.cache.make_key(path, self.cache_namespace)
+                cached = self.cache.get(keys[i])
+                if cached is not None:
+                    results[i] = torch.from_numpy(cached.copy())
+                    continue
+            pending.append(i)
+        
+        with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+            decoded = list(executor.map(
+                lambda i: self._decode_resampled(audio_paths[i]), pending
+            ))
+        
+        # One sequence per channel, as in the single-clip path
+        sequences = []
+        for i, waveform in zip(pending, decoded):
+            if waveform is None or waveform.shape[1] < WAV2VEC2_RECEPTIVE_FIELD:
+                results[i] = torch.randn(1, 512)  # Mock features as fallback
+                continue
+            for channel in range(waveform.shape[0]):
+                sequences.append((i, channel, waveform[channel]))
+        
+        sequences.sort(key=lambda item: item[2].shape[0])
+        pooled = {}
+        for start in range(0, len(sequences), batch_size):
+            bucket = sequences[start:start + batch_size]
+            try:
+                means = self._embed_batch([item[2] for item in bucket])
+            except Exception as e:
+                print(f"⚠️ Audio processing error: {e}, using mock features")
+                for i, _, _ in bucket:
+                    results[i] = torch.randn(1, 512)
+                continue
+            for (i, channel, _), mean in zip(bucket, means):
+                pooled.setdefault(i, {})[channel] = mean
+        
+        for i, channels in pooled.items():
+            if results[i] is not None:
+                continue
+            features = torch.stack([channels[c] for c in sorted(channels)])
+            if self.cache is not None:
+                self.cache.put(keys[i], features.numpy())
+            results[i] = features
+        return results
+    
+    def _decode_resampled(self, audio_path):
+        """Decode one clip at the model sample rate, or None on failure."""
+        try:
+            with stage('audio_decode'):
+                waveform, sample_rate = torchaudio.load(as_stream(audio_path))
+            if sample_rate != self.sample_rate:
+                with stage('audio_resample'):
+                    waveform = torchaudio.functional.resample(waveform, sample_rate, self.sample_rate)
+            return waveform
         except Exception as e:
             print(f"⚠️ Audio processing error: {e}, using mock features")
-            return torch.randn(1, 512)  # Mock features as fallback
+            return None
     
-    def extract_statistical_features(self, audio_path):
-        """Extract statistical features from audio."""
+    def _embed_batch(self, waveforms):
+        """
+        Masked time-mean of first-layer features for 1-D waveforms of any length.
+        
+        The transformer encoder masks padded frames, so it can always run
+        batched. The convolutional front end of group-norm models (such as
+        WAV2VEC2_BASE) normalizes over the whole time axis, where padding
+        would shift the statistics, so there it runs per sequence.
+        """
+        lengths = torch.tensor([w.shape[0] for w in waveforms])
+        padded = torch.nn.utils.rnn.pad_sequence(waveforms, batch_first=True)
+        
+        with self._invoke(), stage('audio_batch_forward'), torch.no_grad():
+            extractor = getattr(self.model, 'feature_extractor', None)
+            encoder = getattr(self.model, 'encoder', None)
+            if extractor is None or encoder is None:
+                features, frame_lengths = self.model.extract_features(padded, lengths, num_layers=1)
+                frames = features[0]
+            else:
+                first_norm = getattr(extractor.conv_layers[0], 'layer_norm', None)
+                if isinstance(first_norm, torch.nn.GroupNorm):
+                    extracted = [extractor(w.unsqueeze(0), None)[0][0] for w in waveforms]
+                    frame_lengths = torch.tensor([e.shape[0] for e in extracted])
+                    conv_frames = torch.nn.utils.rnn.pad_sequence(extracted, batch_first=True)
+                else:
+                    conv_frames, frame_lengths = extractor(padded, lengths)
+                frames = encoder.extract_features(conv_frames, frame_lengths, num_layers=1)[0]
+        
+        mask = torch.arange(frames.shape[1])[None, :] < frame_lengths[:, None]
+        sums = (frames * mask.unsqueeze(-1)).sum(dim=1)
+        return sums / frame_lengths.clamp(min=1).unsqueeze(-1).to(sums.dtype)
+    
+    def extract_statistical_features(self, audio_path, as_series=True):
+        """
+        Extract statistical features from audio.
+        
+        Args:
+            audio_path: Path to audio file, bytes or file-like object
+            as_series: Return a pandas Series (default) instead of an
+                AudioStatistics named tuple
+            
+        Returns:
+            mean, std, max, min and duration of the waveform
+        """
         if not self.torchaudio_available:
             # Return mock statistical features
             features = {
@@ -87,21 +466,11 @@ class AudioProcessor:
                 'min': -1.0,
                 'duration': 2.5
             }
-            return pd.Series(features)
-            
+            return pd.Series(features) if as_series else AudioStatistics(**features)
+        
         try:
-            waveform, sample_rate = torchaudio.load(audio_path)
-            waveform = waveform.numpy()
-            
-            features = {
-                'mean': np.mean(waveform),
-                'std': np.std(waveform),
-                'max': np.max(waveform),
-                'min': np.min(waveform),
-                'duration': waveform.shape[1] / sample_rate
-            }
-            
-            return pd.Series(features)
+            stats = self.compute_statistics(audio_path)
+            return pd.Series(stats._asdict()) if as_series else stats
         except Exception as e:
             print(f"⚠️ Statistical audio processing error: {e}")
             # Return mock features as fallback
@@ -112,5 +481,87 @@ class AudioProcessor:
                 'min': -0.5,
                 'duration': 1.0
             }
-            return pd.Series(features)
-
+            return pd.Series(features) if as_series else AudioStatistics(**features)
+    
+    def compute_statistics(self, audio_path, ddof=0):
+        """
+        Compute waveform statistics in one chunked pass.
+        
+        PCM and float WAV files are memory-mapped and read block by block,
+        so they are never decoded as a whole; other formats are decoded once
+        with torchaudio and then scanned in blocks.
+        
+        Args:
+            audio_path: Path to audio file, bytes or file-like object
+            ddof: Delta degrees of freedom for the standard deviation
+            
+        Returns:
+            AudioStatistics
+        """
+        with stage('audio_statistics'):
+            return self._compute_statistics(audio_path, ddof)
+    
+    def _compute_statistics(self, audio_path, ddof):
+        """Untimed body of compute_statistics."""
+        wav = open_wav(audio_path)
+        if wav is not None:
+            moments = RunningMoments()
+            for block in iter_chunks(wav, STATS_CHUNK_FRAMES):
+                moments.update(block)
+            return self._statistics(moments, len(wav.samples) / wav.sample_rate, ddof)
+        
+        waveform, sample_rate = torchaudio.load(as_stream(audio_path))
+        return self._waveform_statistics(waveform, sample_rate, ddof)
+    
+    def _waveform_statistics(self, waveform, sample_rate, ddof=0):
+        """Statistics of an already decoded (channels, samples) waveform."""
+        moments = RunningMoments()
+        for start in range(0, waveform.shape[1], STATS_CHUNK_FRAMES):
+            moments.update(waveform[:, start:start + STATS_CHUNK_FRAMES].numpy())
+        return self._statistics(moments, waveform.shape[1] / sample_rate, ddof)
+    
+    @staticmethod
+    def _statistics(moments, duration, ddof):
+        return AudioStatistics(
+            mean=float(moments.mean),
+            std=float(moments.std(ddof)),
+            max=float(moments.max),
+            min=float(moments.min),
+            duration=float(duration)
+        )
+    
+    def extract_all(self, audio_path):
+        """
+        Extract model features and statistical features together.
+        
+        On the standard path the file is decoded once and both feature sets
+        are computed from the same waveform. When features come from the
+        cache or the streaming path, statistics are taken in a separate
+        chunked pass instead of a second full decode.
+        
+        Args:
+            audio_path: Path to audio file, bytes or file-like object
+            
+        Returns:
+            Tuple of (features tensor, AudioStatistics)
+        """
+        if (not self.torchaudio_available or self.model is None
+                or self.cache is not None or self.window_seconds):
+            return (self.extract_features(audio_path),
+                    self.extract_statistical_features(audio_path, as_series=False))
+        
+        try:
+            with stage('audio_decode'):
+                waveform, sample_rate = torchaudio.load(as_stream(audio_path))
+        except Exception as e:
+            print(f"⚠️ Audio processing error: {e}, using mock features")
+            return (torch.randn(1, 512),
+                    self.extract_statistical_features(audio_path, as_series=False))
+        
+        statistics = self._waveform_statistics(waveform, sample_rate)
+        try:
+            features = self._waveform_features(waveform, sample_rate)
+        except Exception as e:
+            print(f"⚠️ Audio processing error: {e}, using mock features")
+            features = torch.randn(1, 512)
+        return features, statistics
@@ -0,0 +1,357 @@
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import torch
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.webp')
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg', '.m4a')
+AUDIO_STATISTICS = ('mean', 'std', 'max', 'min', 'duration')
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+def extract_image_batch(image_processor, sources):
+    """
+    Image features for several sources in one batched pass.
+
+    Falls back to one image at a time if the batch fails, so a bad file
+    only fails itself.
+
+    Returns:
+        List with a (1, dim) array or the raised Exception per source
+    """
+    try:
+        features = image_processor.batch_process(sources)
+        return [features[i:i + 1] for i in range(len(sources))]
+    except Exception:
+        results = []
+        for source in sources:
+            try:
+                results.append(image_processor.process_image(source))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+def extract_audio_batch(audio_processor, sources):
+    """
+    Audio features for several sources in one batched pass, falling back
+    to one clip at a time if the batch fails.
+
+    Returns:
+        List with a features tensor or the raised Exception per source
+    """
+    try:
+        return audio_processor.batch_extract(sources)
+    except Exception:
+        results = []
+        for source in sources:
+            try:
+                results.append(audio_processor.extract_features(source))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+def iter_directory(root):
+    """
+    Yield samples found under a directory, in a stable order.
+
+    Images and audio files with the same relative path apart from the
+    extension form one sample; a sibling <name>.json is read as its
+    metadata.
+
+    Yields:
+        Dicts with 'sample_id', 'image', 'audio' (paths or None) and 'metadata'
+    """
+    for directory, subdirs, files in os.walk(root):
+        subdirs.sort()
+        groups = {}
+        for name in sorted(files):
+            stem, extension = os.path.splitext(name)
+            extension = extension.lower()
+            if extension in IMAGE_EXTENSIONS:
+                groups.setdefault(stem, {})['image'] = os.path.join(directory, name)
+            elif extension in AUDIO_EXTENSIONS:
+                groups.setdefault(stem, {})['audio'] = os.path.join(directory, name)
+
+        for stem in sorted(groups):
+            sidecar = os.path.join(directory, stem + '.json')
+            metadata = {}
+            if os.path.exists(sidecar):
+                try:
+                    with open(sidecar) as f:
+                        metadata = json.load(f)
+                except (OSError, ValueError):
+                    metadata = {}
+            relative = os.path.relpath(os.path.join(directory, stem), root)
+            yield {
+                'sample_id': relative.replace(os.sep, '/'),
+                'image': groups[stem].get('image'),
+                'audio': groups[stem].get('audio'),
+                'metadata': metadata,
+            }
+
+
+def _resolve(path, base_dirs):
+    """First existing location of a manifest path, or the path under the first base."""
+    if path is None or os.path.isabs(path):
+        return path
+    for base in base_dirs:
+        candidate = os.path.join(base, path)
+        if os.path.exists(candidate):
+            return candidate
+    return os.path.join(base_dirs[0], path)
+
+
+def iter_manifest(manifest_path):
+    """
+    Yield samples listed in a JSON manifest.
+
+    The manifest holds a 'samples' list of objects with 'sample_id',
+    'image_file', 'audio_file' and 'metadata' (see
+    samples/combined/test_batch_1.json). Relative file names are looked up
+    next to the manifest, then in sibling images/ and audio/ directories.
+
+    Yields:
+        Dicts with 'sample_id', 'image', 'audio' (paths or None) and 'metadata'
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    parent = os.path.dirname(base)
+    image_dirs = [base, os.path.join(parent, 'images'), parent]
+    audio_dirs = [base, os.path.join(parent, 'audio'), parent]
+
+    for index, sample in enumerate(manifest.get('samples', [])):
+        yield {
+            'sample_id': str(sample.get('sample_id', index)),
+            'image': _resolve(sample.get('image_file'), image_dirs),
+            'audio': _resolve(sample.get('audio_file'), audio_dirs),
+            'metadata': sample.get('metadata') or {},
+        }
+
+
+class BatchIngestor:
+    """
+    Extract features for a large collection of samples into shards.
+
+    Samples are processed shard by shard: each shard's images go through
+    ImageProcessor.batch_process and its clips through
+    AudioProcessor.batch_extract (both decode on worker threads and run
+    batched inference), and the result is written as one columnar .npz
+    file. A checkpoint recorded after every shard lets an interrupted run
+    resume at the first unfinished shard.
+
+    Shard columns:
+        sample_id, metadata (JSON strings), error (empty if none),
+        image_features (n x d, NaN rows where missing), has_image,
+        audio_features (n x d, channel mean), has_audio,
+        audio_statistics (n x 5: mean, std, max, min, duration)
+    """
+
+    def __init__(self, output_dir, image_processor=None, audio_processor=None,
+                 shard_size=1024):
+        """
+        Initialize ingestor.
+
+        Args:
+            output_dir: Directory receiving shards and the checkpoint
+            image_processor: ImageProcessor, or None to skip images
+            audio_processor: AudioProcessor, or None to skip audio
+            shard_size: Samples per shard (also the unit of resumption)
+        """
+        self.output_dir = output_dir
+        self.image_processor = image_processor
+        self.audio_processor = audio_processor
+        self.shard_size = max(1, int(shard_size))
+        os.makedirs(output_dir, exist_ok=True)
+
+    @property
+    def checkpoint_path(self):
+        return os.path.join(self.output_dir, CHECKPOINT_FILE)
+
+    def load_checkpoint(self):
+        """Return the saved checkpoint dict, or None."""
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, state):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def run(self, samples, source=None, resume=True, progress=None):
+        """
+        Ingest samples into shards.
+
+        Args:
+            samples: Iterable of sample dicts (see iter_directory), in a
+                stable order so a resumed run skips the same samples
+            source: Label stored in the checkpoint; resuming a different
+                source or shard size raises ValueError
+            resume: Continue from the checkpoint if one exists
+            progress: Optional callable receiving the checkpoint after each shard
+
+        Returns:
+            The final checkpoint dict
+        """
+        state = self.load_checkpoint() if resume else None
+        if state is not None:
+            if state.get('source') != source or state.get('shard_size') != self.shard_size:
+                raise ValueError(
+                    f"Checkpoint in {self.output_dir} is for source {state.get('source')!r} "
+                    f"with shard_size {state.get('shard_size')}; use a new output "
+                    "directory or disable resume"
+                )
+        else:
+            state = {
+                'source': source,
+                'shard_size': self.shard_size,
+                'shards': 0,
+                'samples': 0,
+                'errors': 0,
+                'elapsed_seconds': 0.0,
+                'complete': False,
+            }
+            self._save_checkpoint(state)
+
+        samples = itertools.islice(iter(samples), state['samples'], None)
+        while True:
+            shard = list(itertools.islice(samples, self.shard_size))
+            if not shard:
+                break
+            start = time.perf_counter()
+            columns = self.process_shard(shard)
+            name = f"shard-{state['shards']:05d}.npz"
+            self._write_shard(name, columns)
+
+            state['shards'] += 1
+            state['samples'] += len(shard)
+            state['errors'] += int(np.count_nonzero(columns['error']))
+            state['elapsed_seconds'] += time.perf_counter() - start
+            self._save_checkpoint(state)
+            if progress is not None:
+                progress(state)
+
+        state['complete'] = True
+        self._save_checkpoint(state)
+        return state
+
+    def process_shard(self, shard):
+        """
+        Extract every column for one list of samples.
+
+        Returns:
+            Dictionary of column name to numpy array
+        """
+        count = len(shard)
+        errors = [[] for _ in range(count)]
+
+        image_features, has_image = self._image_column(shard, errors)
+        audio_features, has_audio, audio_statistics = self._audio_columns(shard, errors)
+
+        return {
+            'sample_id': np.array([str(s['sample_id']) for s in shard]),
+            'metadata': np.array([json.dumps(s.get('metadata') or {}, sort_keys=True, default=str)
+                                  for s in shard]),
+            'error': np.array(['; '.join(e) for e in errors]),
+            'image_features': image_features,
+            'has_image': has_image,
+            'audio_features': audio_features,
+            'has_audio': has_audio,
+            'audio_statistics': audio_statistics,
+        }
+
+    def _image_column(self, shard, errors):
+        count = len(shard)
+        has_image = np.zeros(count, dtype=bool)
+        items = [i for i, s in enumerate(shard) if s.get('image')]
+        if self.image_processor is None or not items:
+            return np.empty((count, 0), dtype=np.float32), has_image
+
+        features = np.full((count, self.image_processor.feature_dim), np.nan, dtype=np.float32)
+        extracted = extract_image_batch(self.image_processor, [shard[i]['image'] for i in items])
+        for i, result in zip(items, extracted):
+            if isinstance(result, Exception):
+                errors[i].append(f"Image processing error: {result}")
+                continue
+            features[i] = result.reshape(-1)
+            has_image[i] = True
+        return features, has_image
+
+    def _audio_columns(self, shard, errors):
+        count = len(shard)
+        has_audio = np.zeros(count, dtype=bool)
+        statistics = np.full((count, len(AUDIO_STATISTICS)), np.nan, dtype=np.float64)
+        items = [i for i, s in enumerate(shard) if s.get('audio')]
+        if self.audio_processor is None or not items:
+            return np.empty((count, 0), dtype=np.float32), has_audio, statistics
+
+        rows = {}
+        extracted = extract_audio_batch(self.audio_processor, [shard[i]['audio'] for i in items])
+        for i, result in zip(items, extracted):
+            if isinstance(result, Exception):
+                errors[i].append(f"Audio processing error: {result}")
+                continue
+            if isinstance(result, torch.Tensor):
+                result = result.detach().cpu().numpy()
+            # One row per clip: average the per-channel features
+            rows[i] = np.asarray(result, dtype=np.float32).reshape(-1, result.shape[-1]).mean(axis=0)
+            try:
+                stats = self.audio_processor.compute_statistics(shard[i]['audio'])
+                statistics[i] = [getattr(stats, name) for name in AUDIO_STATISTICS]
+            except Exception as e:
+                errors[i].append(f"Audio statistics error: {e}")
+
+        width = max((len(row) for row in rows.values()), default=0)
+        features = np.full((count, width), np.nan, dtype=np.float32)
+        for i, row in rows.items():
+            if len(row) != width:
+                # Fallback features of another width cannot share the column
+                errors[i].append(f"Audio features have width {len(row)}, expected {width}")
+                continue
+            features[i] = row
+            has_audio[i] = True
+        return features, has_audio, statistics
+
+    def _write_shard(self, name, columns):
+        path = os.path.join(self.output_dir, name)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **columns)
+        os.replace(tmp_path, path)
+
+
+def load_shards(output_dir):
+    """
+    Concatenate every shard written by BatchIngestor.
+
+    Returns:
+        Dictionary of column name to numpy array
+    """
+    names = sorted(n for n in os.listdir(output_dir)
+                   if n.startswith('shard-') and n.endswith('.npz'))
+    parts = []
+    for name in names:
+        with np.load(os.path.join(output_dir, name)) as shard:
+            parts.append({key: shard[key] for key in shard.files})
+    if not parts:
+        return {}
+    columns = {}
+    for key in parts[0]:
+        arrays = [part[key] for part in parts]
+        if arrays[0].ndim == 2:
+            # Feature widths can differ between shards only when a modality
+            # was missing from a whole shard; pad those with NaN
+            width = max(a.shape[1] for a in arrays)
+            arrays = [a if a.shape[1] == width else
+                      np.hstack([a, np.full((len(a), width - a.shape[1]), np.nan, dtype=a.dtype)])
+                      for a in arrays]
+        columns[key] = np.concatenate(arrays)
+    return columns
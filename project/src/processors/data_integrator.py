@@ -1,17 +1,47 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 import networkx as nx
 import torch
+import threading
+
+from ..utils.similarity import iter_similar_pairs
+from ..utils.ann_index import RandomProjectionIndex
+from ..utils.incremental_scaler import IncrementalScaler
+from ..utils.metadata_encoder import MetadataEncoder
+from ..utils.metrics import stage
 
 
 class DataIntegrator:
-    def __init__(self):
-        """Initialize data integrator with scaler."""
-        self.scaler = StandardScaler()
-        self.is_fitted = False
+    def __init__(self, live_graph_threshold=0.5, live_graph_k=10, scaler=None,
+                 metadata_encoder=None):
+        """
+        Initialize data integrator with scaler.
+        
+        Args:
+            live_graph_threshold: Similarity threshold for edges in the live graph
+            live_graph_k: Maximum neighbours linked per item in the live graph
+            scaler: Optional IncrementalScaler (e.g. restored from saved state)
+            metadata_encoder: Optional MetadataEncoder (hashing by default)
+        """
+        self.scaler = scaler if scaler is not None else IncrementalScaler()
+        # Request threads and job-queue workers share the scaler; an update
+        # and the transform that follows it must see consistent moments
+        self._scaler_lock = threading.Lock()
+        self.metadata_encoder = metadata_encoder if metadata_encoder is not None else MetadataEncoder()
+        self.feature_columns = []
+        self._column_layout = None
+        
+        self.live_graph_threshold = live_graph_threshold
+        self.live_graph_k = live_graph_k
+        self.live_graph = nx.Graph()
+        self.live_index = None
+        self._live_lock = threading.Lock()
     
-    def combine_modalities(self, image_features, audio_features, metadata):
+    @property
+    def is_fitted(self):
+        return self.scaler.is_fitted
+    
+    def combine_modalities(self, image_features, audio_features, metadata, update_scaler=True):
         """
         Combine features from different modalities.
         
@@ -19,93 +49,270 @@ class DataIntegrator:
             image_features: numpy array of image features
             audio_features: torch tensor or numpy array of audio features
             metadata: pandas DataFrame with metadata
+            update_scaler: Fold these rows into the running scaler statistics
+                before scaling them
             
         Returns:
             numpy array of combined and scaled features
         """
-        # Convert image features to DataFrame with consistent column names
-        if isinstance(image_features, np.ndarray):
-            if len(image_features.shape) == 1:
-                image_features = image_features.reshape(1, -1)
-            img_df = pd.DataFrame(image_features, columns=[f'img_feat_{i}' for i in range(image_features.shape[1])])
-        else:
-            img_df = pd.DataFrame([image_features], columns=[f'img_feat_{i}' for i in range(len(image_features))])
-        
-        # Convert audio features to DataFrame with consistent column names
-        if isinstance(audio_features, torch.Tensor):
-            audio_np = audio_features.cpu().numpy()
-            if len(audio_np.shape) == 1:
-                audio_np = audio_np.reshape(1, -1)
-            audio_df = pd.DataFrame(audio_np, columns=[f'audio_feat_{i}' for i in range(audio_np.shape[1])])
-        else:
-            if isinstance(audio_features, np.ndarray):
-                if len(audio_features.shape) == 1:
-                    audio_features = audio_features.reshape(1, -1)
-                audio_df = pd.DataFrame(audio_features, columns=[f'audio_feat_{i}' for i in range(audio_features.shape[1])])
-            else:
-                audio_df = pd.DataFrame([audio_features], columns=[f'audio_feat_{i}' for i in range(len(audio_features))])
-        
-        # Convert metadata to DataFrame with string column names
-        if not isinstance(metadata, pd.DataFrame):
-            metadata = pd.DataFrame([metadata])
-        
-        # Ensure all metadata columns are strings and values are numeric
-        metadata_processed = pd.DataFrame()
-        for col, val in metadata.items():
-            col_name = f'meta_{str(col)}'
-            # Convert values to numeric if possible, otherwise use ordinal encoding
-            if isinstance(val.iloc[0] if hasattr(val, 'iloc') else val, (int, float)):
-                metadata_processed[col_name] = pd.to_numeric(val, errors='coerce').fillna(0)
-            else:
-                # Simple ordinal encoding for strings
-                metadata_processed[col_name] = [hash(str(v)) % 1000 for v in (val if hasattr(val, '__iter__') and not isinstance(val, str) else [val])]
-        
-        # Reset indices for concatenation
-        img_df.reset_index(drop=True, inplace=True)
-        audio_df.reset_index(drop=True, inplace=True)
-        metadata_processed.reset_index(drop=True, inplace=True)
-        
-        # Combine all features - only numeric columns
-        combined = pd.concat([metadata_processed, img_df, audio_df], axis=1)
-        
-        # Ensure all data is numeric
-        combined = combined.select_dtypes(include=[np.number])
-        
-        # Scale features
-        if not self.is_fitted:
-            scaled = self.scaler.fit_transform(combined)
-            self.is_fitted = True
-        else:
-            scaled = self.scaler.transform(combined)
+        with stage('combine_modalities'):
+            meta_values, meta_columns = self._encode_metadata(metadata)
+            return self.combine_arrays(image_features, audio_features, meta_values,
+                                       metadata_columns=meta_columns, dtype=None,
+                                       update_scaler=update_scaler)
+    
+    def _encode_metadata(self, metadata):
+        """
+        Turn metadata into a numeric matrix with the metadata encoder.
+        
+        Returns:
+            Tuple of (float64 array of shape (rows, columns), column names)
+        """
+        return self.metadata_encoder.transform(metadata)
+    
+    @staticmethod
+    def _as_rows(features):
+        """View features (numpy, torch or list) as a 2-D array, one row per item."""
+        if features is None:
+            return None
+        if isinstance(features, torch.Tensor):
+            features = features.detach().cpu().numpy()
+        features = np.asarray(features)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        return features
+    
+    def combine_arrays(self, image_features, audio_features, metadata=None,
+                       metadata_columns=None, dtype=np.float32, update_scaler=True):
+        """
+        Combine modality arrays straight into one preallocated matrix.
+        
+        The array-native equivalent of combine_modalities: each modality is
+        copied once into its column range of a (rows x features) matrix,
+        which is then scaled in place. Column names are kept on the side in
+        self.feature_columns and only rebuilt when the layout changes.
+        Modalities with a single row are broadcast to the batch size.
         
-        return scaled
+        Args:
+            image_features: numpy array or torch tensor, (rows, d) or (d,)
+            audio_features: numpy array or torch tensor, (rows, d) or (d,)
+            metadata: Optional numeric array of already-encoded metadata
+            metadata_columns: Names of the metadata columns
+            dtype: Output dtype (float32 by default); None promotes the
+                input dtypes the way pandas and scikit-learn would
+            update_scaler: Fold these rows into the running scaler statistics
+                before scaling them
+            
+        Returns:
+            numpy array of combined and scaled features
+        """
+        blocks = [self._as_rows(metadata), self._as_rows(image_features),
+                  self._as_rows(audio_features)]
+        rows = max(block.shape[0] for block in blocks if block is not None)
+        widths = [0 if block is None else block.shape[1] for block in blocks]
+        for block in blocks:
+            if block is not None and block.shape[0] not in (1, rows):
+                raise ValueError(f"Modalities have mismatched row counts: {block.shape[0]} vs {rows}")
+        
+        if metadata_columns is None:
+            metadata_columns = [f'meta_{i}' for i in range(widths[0])]
+        layout = (tuple(metadata_columns), widths[1], widths[2])
+        if layout != self._column_layout:
+            self._column_layout = layout
+            self.feature_columns = (list(metadata_columns)
+                                    + [f'img_feat_{i}' for i in range(widths[1])]
+                                    + [f'audio_feat_{i}' for i in range(widths[2])])
+        
+        if dtype is None:
+            dtype = np.result_type(*[block.dtype for block, width in zip(blocks, widths) if width])
+            if not np.issubdtype(dtype, np.floating):
+                dtype = np.float64
+        combined = np.empty((rows, sum(widths)), dtype=dtype)
+        column = 0
+        for block, width in zip(blocks, widths):
+            if width:
+                combined[:, column:column + width] = block
+            column += width
+        
+        # Scale features against statistics accumulated over every batch
+        with self._scaler_lock:
+            if update_scaler:
+                self.scaler.partial_fit(combined)
+            return self.scaler.transform(combined, copy=False)
     
-    def build_relationship_graph(self, data):
+    def build_relationship_graph(self, data, threshold=0.5, block_size=2048,
+                                 include_features=True, method='exact', k=None,
+                                 probes=1, index_params=None, ids=None):
         """
         Build a NetworkX graph from data relationships.
         
+        data may be a plain 2-D array instead of a DataFrame, including a
+        FeatureStore.vectors() memory map: tiles are then sliced straight
+        from it, so a large store is streamed rather than loaded.
+        
+        With method='exact', pairwise similarities (dot products of feature
+        rows) are computed in blocked matrix products over the upper
+        triangle, so memory stays bounded by one block_size x block_size
+        tile. With method='ann', a RandomProjectionIndex proposes candidate
+        neighbours and only those pairs are scored, which trades a little
+        recall for sub-quadratic cost.
+        
         Args:
-            data: pandas DataFrame with features
+            data: pandas DataFrame or 2-D array with features
+            threshold: Similarity above which an edge is created
+            block_size: Rows per tile of the similarity computation
+            include_features: Attach each row as a 'features' node attribute
+            method: 'exact' or 'ann'
+            k: With method='ann', link at most k neighbours per item
+            probes: With method='ann', extra buckets probed per hash table
+            index_params: With method='ann', keyword arguments for
+                RandomProjectionIndex (num_tables, num_bits, seed)
+            ids: Optional node identifiers, one per row (default item_<i>)
             
         Returns:
-            NetworkX Graph object
+            NetworkX Graph object; for method='ann' the index is stored in
+            graph.graph['index'] so the graph can be extended with add_to_graph
         """
+        if method not in ('exact', 'ann'):
+            raise ValueError(f"method must be 'exact' or 'ann', got {method!r}")
+        
         G = nx.Graph()
+        is_frame = isinstance(data, pd.DataFrame)
+        if not is_frame:
+            data = self._as_rows(data)
+        if ids is not None and len(ids) != len(data):
+            raise ValueError(f"Got {len(ids)} ids for {len(data)} rows")
         
         # Add nodes with features
-        for i, row in data.iterrows():
-            G.add_node(f"item_{i}", features=row.to_dict())
+        if ids is not None:
+            node_ids = list(ids)
+        elif is_frame:
+            node_ids = [f"item_{i}" for i in data.index]
+        else:
+            node_ids = [f"item_{i}" for i in range(len(data))]
+        if include_features:
+            # Array rows are attached as views, not copies
+            rows = data.to_dict('records') if is_frame else data
+            G.add_nodes_from(
+                (node, {'features': row})
+                for node, row in zip(node_ids, rows)
+            )
+        else:
+            G.add_nodes_from(node_ids)
         
-        # Add edges based on similarity (cosine similarity threshold)
-        for i in range(len(data)):
-            for j in range(i + 1, len(data)):
-                # Calculate similarity (simplified - could use cosine similarity)
-                similarity = np.dot(data.iloc[i].values, data.iloc[j].values)
-                if similarity > 0.5:  # Threshold for edge creation
-                    G.add_edge(f"item_{i}", f"item_{j}", weight=similarity)
+        if method == 'ann':
+            vectors = data.to_numpy(dtype=np.float32) if is_frame else np.asarray(data, dtype=np.float32)
+            index = RandomProjectionIndex(vectors.shape[1], **(index_params or {}))
+            G.graph['index'] = index
+            self.add_to_graph(G, index, vectors, node_ids, threshold=threshold,
+                              k=k, probes=probes)
+            return G
+        
+        # Add edges based on similarity, one tile at a time
+        if is_frame:
+            vectors = data.to_numpy(dtype=np.float64)
+        elif np.issubdtype(data.dtype, np.floating):
+            # Keep float32 (and memory maps) as they are; tiles are computed in place
+            vectors = data
+        else:
+            vectors = data.astype(np.float64)
+        names = np.array(node_ids, dtype=object)
+        for rows, cols, values in iter_similar_pairs(vectors, threshold, block_size):
+            G.add_weighted_edges_from(zip(names[rows], names[cols], values.tolist()))
         
         return G
     
+    def add_to_graph(self, graph, index, vectors, ids, threshold=0.5, k=None, probes=1):
+        """
+        Incrementally add items to an approximate relationship graph.
+        
+        The new vectors are inserted into the index and then queried against
+        everything indexed so far (including each other), so existing edges
+        never need to be recomputed.
+        
+        Args:
+            graph: NetworkX Graph to extend
+            index: RandomProjectionIndex holding the graph's items
+            vectors: Array of shape (n, dim) for the new items
+            ids: Node identifiers for the new items
+            threshold: Similarity above which an edge is created
+            k: Link at most k neighbours per new item (None for all)
+            probes: Extra buckets probed per hash table
+            
+        Returns:
+            Number of edges added
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        positions = index.add(vectors, ids)
+        graph.add_nodes_from(ids)
+        
+        neighbours = index.query(vectors, k=k, threshold=threshold, probes=probes,
+                                 exclude=positions)
+        edges = [
+            (new_id, index.ids[position], similarity)
+            for new_id, (found, similarities) in zip(ids, neighbours)
+            for position, similarity in zip(found.tolist(), similarities.tolist())
+        ]
+        before = graph.number_of_edges()
+        graph.add_weighted_edges_from(edges)
+        return graph.number_of_edges() - before
+    
+    def embedding_vector(self, image_features, audio_features):
+        """
+        One item's fixed-width vector for the live relationship graph.
+        
+        Combined vectors change width with the metadata fields a request
+        sends, so the graph links items by their model embeddings only.
+        Each modality is averaged over its rows (e.g. audio channels) and
+        normalized to unit length, and the two are concatenated with weight
+        1/sqrt(2), so the inner product of two items is the mean of their
+        image and audio cosine similarities.
+        
+        Args:
+            image_features: numpy array or torch tensor of one image's features
+            audio_features: numpy array or torch tensor of one clip's features
+            
+        Returns:
+            float32 numpy array of shape (1, image dim + audio dim)
+        """
+        parts = []
+        for features in (image_features, audio_features):
+            vector = self._as_rows(features).astype(np.float32).mean(axis=0)
+            norm = np.linalg.norm(vector)
+            parts.append(vector / norm if norm > 0 else vector)
+        return (np.concatenate(parts) / np.sqrt(2)).astype(np.float32).reshape(1, -1)
+    
+    def update_live_graph(self, vectors, ids):
+        """
+        Add items to the process-wide live relationship graph.
+        
+        The first call fixes the vector dimensionality of the live index;
+        vectors of any other width are rejected, so pass fixed-width
+        vectors such as those from embedding_vector.
+        
+        Args:
+            vectors: Array of shape (n, dim)
+            ids: Node identifiers for the new items
+            
+        Returns:
+            Dictionary with the live graph size and each new item's neighbours
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        with self._live_lock:
+            if self.live_index is None:
+                self.live_index = RandomProjectionIndex(vectors.shape[1])
+            elif vectors.shape[1] != self.live_index.dim:
+                raise ValueError(
+                    f"Live graph holds {self.live_index.dim}-d vectors, got {vectors.shape[1]}-d"
+                )
+            self.add_to_graph(self.live_graph, self.live_index, vectors, ids,
+                              threshold=self.live_graph_threshold, k=self.live_graph_k)
+            return {
+                'nodes': self.live_graph.number_of_nodes(),
+                'edges': self.live_graph.number_of_edges(),
+                'neighbors': {item: list(self.live_graph.neighbors(item)) for item in ids}
+            }
+    
     def analyze_graph(self, graph):
         """Analyze graph properties."""
         return {
@@ -1,18 +1,85 @@
+import os
+from contextlib import nullcontext
+
 import torch
 import torchvision
 import torchvision.transforms as transforms
 from PIL import Image
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.cpu_inference import (DEFAULT_MAX_COSINE_DRIFT, ChannelsLastInput, apply_profile,
+                                   freeze_traced, has_linear_layers, profile_options,
+                                   quantize_linear)
+from ..utils.metrics import stage
+from ..utils.model_loader import LazyModel, load_with_weight_cache
+from ..utils.uploads import as_stream
+
+
+# Rough peak working set of one 224x224 image through ResNet50 under
+# torch.no_grad() (input tensor plus the largest live activations).
+# Used to turn a memory budget into a mini-batch size.
+BYTES_PER_IMAGE_ESTIMATE = 24 * 1024 * 1024
+
+# Output width of each ResNet50 stage after global average pooling
+RESNET50_STAGE_DIMS = {
+    'layer1': 256,
+    'layer2': 512,
+    'layer3': 1024,
+    'layer4': 2048,
+}
+FEATURE_MODES = ('logits', 'embedding', 'truncated')
 
 
 class ImageProcessor:
-    def __init__(self):
-        """Initialize image processor with pre-trained ResNet50 model."""
+    def __init__(self, batch_size=32, num_workers=4, feature_mode='logits',
+                 truncate_after='layer3', pretrained=True, cache=None,
+                 lazy=False, weights_cache_dir=None, inference_profile='fp32',
+                 max_cosine_drift=DEFAULT_MAX_COSINE_DRIFT, execution=None):
+        """
+        Initialize image processor with pre-trained ResNet50 model.
+        
+        Args:
+            batch_size: Default mini-batch size used by batch_process
+            num_workers: Number of threads used to decode and transform images
+            feature_mode: 'logits' for the 1000-way ImageNet head,
+                'embedding' for the 2048-d pooled penultimate layer, or
+                'truncated' to stop after an earlier stage and pool there
+            truncate_after: Last ResNet stage kept in 'truncated' mode
+                ('layer1' to 'layer4')
+            pretrained: Load ImageNet weights (False gives a random-init
+                model, useful offline)
+            cache: Optional FeatureCache consulted by process_image
+            lazy: Defer building the model until first use (or warm_up)
+            weights_cache_dir: Directory for a local copy of the pretrained
+                weights, memory-mapped on later starts
+            inference_profile: 'fp32', 'cpu' (int8 Linear layers,
+                channels-last and a frozen TorchScript graph) or 'cpu_fp32'
+                (the same without quantization); see utils.cpu_inference
+            max_cosine_drift: Largest 1 - cosine similarity to the fp32
+                output accepted from an optimized model
+            execution: Optional ExecutionConfig bounding concurrent forward
+                passes and their threads (see utils.execution)
+        """
+        profile_options(inference_profile)
+        if feature_mode not in FEATURE_MODES:
+            raise ValueError(f"feature_mode must be one of {FEATURE_MODES}, got {feature_mode!r}")
+        if feature_mode == 'truncated' and truncate_after not in RESNET50_STAGE_DIMS:
+            raise ValueError(f"truncate_after must be one of {tuple(RESNET50_STAGE_DIMS)}, got {truncate_after!r}")
+        
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.model = torchvision.models.resnet50(pretrained=True)
-        self.model.eval()
-        self.model.to(self.device)
+        self.feature_mode = feature_mode
+        self.pretrained = pretrained
+        self.cache = cache
+        self.truncate_after = truncate_after if feature_mode == 'truncated' else None
+        self.weights_cache_dir = weights_cache_dir
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.inference_profile = inference_profile
+        self.max_cosine_drift = max_cosine_drift
+        self.inference_report = None
+        self.execution = execution
         
         self.transform = transforms.Compose([
             transforms.Resize(256),
@@ -21,35 +88,234 @@ class ImageProcessor:
             transforms.Normalize(mean=[0.485, 0.456, 0.406], 
                                std=[0.229, 0.224, 0.225])
         ])
+        
+        self._model_handle = LazyModel('image', self._load_model)
+        if not lazy:
+            self._model_handle.get()
+    
+    @property
+    def model(self):
+        """The feature model, built on first access when lazy."""
+        return self._model_handle.get()
+    
+    def warm_up(self):
+        """Build the model on a background thread; returns the thread."""
+        return self._model_handle.warm_up()
+    
+    def model_status(self):
+        """Load state of the model and its inference profile, for health reporting."""
+        return dict(self._model_handle.status(), inference_profile=self.inference_profile,
+                    inference=self.inference_report)
+    
+    def _invoke(self):
+        """Slot and thread budget for one forward pass."""
+        if self.execution is None:
+            return nullcontext()
+        return self.execution.invoke('image')
+    
+    @property
+    def feature_dim(self):
+        """Width of the feature vector produced for one image."""
+        if self.feature_mode == 'logits':
+            return 1000
+        if self.feature_mode == 'embedding':
+            return RESNET50_STAGE_DIMS['layer4']
+        return RESNET50_STAGE_DIMS[self.truncate_after]
+    
+    @property
+    def cache_namespace(self):
+        """Identifies the model and preprocessing behind cached features."""
+        weights = 'imagenet' if self.pretrained else 'random'
+        if self.inference_profile != 'fp32':
+            # Optimized models agree with fp32 only up to max_cosine_drift
+            weights += f"+{self.inference_profile}"
+        return f"resnet50:{weights}:{self.feature_mode}:{self.truncate_after}:{self.transform!r}"
+    
+    def _load_model(self):
+        """Build the configured ResNet50, via the weight cache when enabled."""
+        if self.pretrained and self.weights_cache_dir:
+            name = f"resnet50_{self.feature_mode}_{self.truncate_after or 'full'}.pt"
+            model = load_with_weight_cache(
+                lambda: self._build_model(torchvision.models.resnet50(pretrained=False)),
+                lambda: self._build_model(torchvision.models.resnet50(pretrained=True)),
+                os.path.join(self.weights_cache_dir, name)
+            )
+        else:
+            model = self._build_model(torchvision.models.resnet50(pretrained=self.pretrained))
+        model.eval()
+        model = model.to(self.device)
+        if self.inference_profile != 'fp32':
+            model = self._apply_inference_profile(model)
+        return model
+    
+    def _apply_inference_profile(self, model):
+        """Optimize the loaded model for CPU inference (see utils.cpu_inference)."""
+        if self.device.type != 'cpu':
+            print(f"⚠️ Inference profile {self.inference_profile!r} targets CPU; running fp32 on {self.device}")
+            return model
+        options = profile_options(self.inference_profile)
+        
+        def optimize(model):
+            steps = []
+            if options['quantize'] and has_linear_layers(model):
+                # Only the 1000-way head is Linear; convolutions stay fp32
+                model = quantize_linear(model)
+                steps.append('dynamic_int8_linear')
+            if options['channels_last']:
+                model = ChannelsLastInput(model)
+                steps.append('channels_last')
+            if options['torchscript']:
+                model = freeze_traced(model, torch.randn(2, 3, 224, 224))
+                steps.append('torchscript_frozen')
+            return model, steps
+        
+        generator = torch.Generator().manual_seed(0)
+        examples = [torch.randn(4, 3, 224, 224, generator=generator)]
+        model, self.inference_report = apply_profile(
+            'image', model, optimize, lambda m, x: m(x).reshape(len(x), -1),
+            examples, self.max_cosine_drift
+        )
+        return model
+    
+    def _build_model(self, resnet):
+        """Cut the ResNet50 down to the module that produces the requested features."""
+        if self.feature_mode == 'logits':
+            return resnet
+        if self.feature_mode == 'embedding':
+            # avgpool output flattened is exactly what fc would consume
+            resnet.fc = torch.nn.Identity()
+            return resnet
+        
+        stages = ['layer1', 'layer2', 'layer3', 'layer4']
+        kept = stages[:stages.index(self.truncate_after) + 1]
+        return torch.nn.Sequential(
+            resnet.conv1, resnet.bn1, resnet.relu, resnet.maxpool,
+            *[getattr(resnet, name) for name in kept],
+            torch.nn.AdaptiveAvgPool2d(1),
+            torch.nn.Flatten(1),
+        )
+    
+    def load_tensor(self, image_path):
+        """Decode an image and apply the model transform (no batch dimension)."""
+        with stage('image_decode'):
+            image = Image.open(as_stream(image_path)).convert('RGB')
+        with stage('image_transform'):
+            return self.transform(image)
     
     def process_image(self, image_path):
         """
         Process an image and extract features.
         
         Args:
-            image_path: Path to image file or file-like object
+            image_path: Path to image file, bytes or file-like object
             
         Returns:
             numpy array of extracted features
         """
-        if isinstance(image_path, str):
-            image = Image.open(image_path).convert('RGB')
-        else:
-            # Handle file-like object (e.g., from Flask upload)
-            image = Image.open(image_path).convert('RGB')
-        
-        tensor = self.transform(image).unsqueeze(0).to(self.device)
+        if self.cache is not None:
+            return self.cache.get_or_compute(image_path, self.cache_namespace, self._extract)
+        return self._extract(image_path)
+    
+    def _extract(self, image_path):
+        """Run one image through the model, bypassing the cache."""
+        tensor = self.load_tensor(image_path).unsqueeze(0).to(self.device)
         
-        with torch.no_grad():
-            features = self.model(tensor)
+        model = self.model
+        with self._invoke(), stage('image_forward'), torch.no_grad():
+            features = model(tensor)
         
         return features.cpu().numpy()
     
-    def batch_process(self, image_paths):
-        """Process multiple images at once."""
-        results = []
-        for path in image_paths:
-            features = self.process_image(path)
-            results.append(features.flatten())
-        return np.array(results)
-
+    def auto_batch_size(self, memory_budget_mb):
+        """
+        Pick the largest mini-batch size that fits in a memory budget.
+        
+        Args:
+            memory_budget_mb: Memory available for one forward pass, in MiB
+            
+        Returns:
+            Batch size (at least 1)
+        """
+        budget = int(memory_budget_mb * 1024 * 1024)
+        return max(1, budget // BYTES_PER_IMAGE_ESTIMATE)
+    
+    def batch_process(self, image_paths, batch_size=None, memory_budget_mb=None,
+                      num_workers=None):
+        """
+        Process multiple images with batched forward passes.
+        
+        Images are decoded and transformed on a thread pool while the
+        previous mini-batch runs through the model, so decode and inference
+        overlap. Each mini-batch is a single forward call. With a feature
+        cache, cached images are skipped and new results are stored.
+        
+        Args:
+            image_paths: Sequence of paths, bytes or file-like objects
+            batch_size: Mini-batch size; defaults to self.batch_size
+            memory_budget_mb: If given and batch_size is not, derive the
+                batch size from this budget via auto_batch_size
+            num_workers: Decode threads; defaults to self.num_workers
+            
+        Returns:
+            numpy array of shape (len(image_paths), feature_dim)
+        """
+        image_paths = list(image_paths)
+        if batch_size is None:
+            if memory_budget_mb is not None:
+                batch_size = self.auto_batch_size(memory_budget_mb)
+            else:
+                batch_size = self.batch_size
+        batch_size = max(1, int(batch_size))
+        num_workers = self.num_workers if num_workers is None else num_workers
+        
+        if not image_paths:
+            return np.empty((0, self.feature_dim), dtype=np.float32)
+        
+        keys = [None] * len(image_paths)
+        cached = {}
+        missing = []
+        for i, path in enumerate(image_paths):
+            if self.cache is not None:
+                keys[i] = self.cache.make_key(path, self.cache_namespace)
+                hit = self.cache.get(keys[i])
+                if hit is not None:
+                    cached[i] = hit.reshape(-1)
+                    continue
+            missing.append(i)
+        
+        results = None
+        if cached:
+            first = next(iter(cached.values()))
+            results = np.empty((len(image_paths), first.shape[0]), dtype=first.dtype)
+            for i, features in cached.items():
+                results[i] = features
+        if not missing:
+            return results
+        
+        chunks = [missing[i:i + batch_size]
+                  for i in range(0, len(missing), batch_size)]
+        
+        with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+            # Keep one mini-batch of decodes in flight ahead of the model
+            pending = [executor.submit(self.load_tensor, image_paths[i]) for i in chunks[0]]
+            for index, chunk in enumerate(chunks):
+                tensors = [future.result() for future in pending]
+                if index + 1 < len(chunks):
+                    pending = [executor.submit(self.load_tensor, image_paths[i])
+                               for i in chunks[index + 1]]
+                
+                batch = torch.stack(tensors).to(self.device)
+                model = self.model
+                with self._invoke(), stage('image_batch_forward'), torch.no_grad():
+                    features = model(batch)
+                features = features.reshape(len(tensors), -1).cpu().numpy()
+                
+                if results is None:
+                    results = np.empty((len(image_paths), features.shape[1]),
+                                       dtype=features.dtype)
+                results[chunk] = features
+                if self.cache is not None:
+                    for i, row in zip(chunk, features):
+                        self.cache.put(keys[i], row.reshape(1, -1))
+        
+        return results
@@ -0,0 +1,156 @@
+import numpy as np
+
+
+class RandomProjectionIndex:
+    """
+    Approximate nearest-neighbour index using random-projection LSH.
+
+    Every table hashes a vector to the sign pattern of num_bits random
+    projections, so vectors at a small angle tend to share a bucket. A query
+    gathers candidates from its bucket in every table (plus, with probes > 0,
+    the buckets reached by flipping its least certain bits) and re-ranks
+    them by exact inner product. Items can be added at any time without
+    rebuilding.
+
+    Recall rises with num_tables and probes and falls with num_bits; query
+    cost moves the opposite way.
+    """
+
+    def __init__(self, dim, num_tables=8, num_bits=12, seed=0):
+        """
+        Initialize an empty index.
+
+        Args:
+            dim: Vector dimensionality
+            num_tables: Number of independent hash tables
+            num_bits: Projections (hash bits) per table, at most 62
+            seed: Seed for the random projections
+        """
+        if not 0 < num_bits <= 62:
+            raise ValueError(f"num_bits must be between 1 and 62, got {num_bits}")
+        self.dim = dim
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+
+        rng = np.random.default_rng(seed)
+        # (dim, tables * bits) so one matmul hashes every table at once
+        self._planes = rng.standard_normal((dim, num_tables * num_bits)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(num_bits, dtype=np.int64))
+
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._size = 0
+        self.ids = []
+        self._buckets = [dict() for _ in range(num_tables)]
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self):
+        """View of the stored vectors, one row per item."""
+        return self._vectors[:self._size]
+
+    def _project(self, vectors):
+        """Return projections shaped (n, tables, bits)."""
+        projections = vectors @ self._planes
+        return projections.reshape(len(vectors), self.num_tables, self.num_bits)
+
+    def _codes(self, projections):
+        """Pack projection signs into one int64 bucket code per table."""
+        return (projections > 0).astype(np.int64) @ self._bit_weights
+
+    def add(self, vectors, ids=None):
+        """
+        Add vectors to the index.
+
+        Args:
+            vectors: Array of shape (n, dim)
+            ids: Optional list of n item identifiers (defaults to positions)
+
+        Returns:
+            numpy array of the positions assigned to the new items
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        count = len(vectors)
+        if ids is None:
+            ids = list(range(self._size, self._size + count))
+        elif len(ids) != count:
+            raise ValueError(f"Got {len(ids)} ids for {count} vectors")
+
+        needed = self._size + count
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors), 1024)
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._vectors[self._size:needed] = vectors
+
+        positions = np.arange(self._size, needed)
+        codes = self._codes(self._project(vectors))
+        for table, buckets in enumerate(self._buckets):
+            # Group the batch by bucket so each bucket is touched once
+            order = np.argsort(codes[:, table], kind='stable')
+            unique_codes, starts = np.unique(codes[order, table], return_index=True)
+            for code, group in zip(unique_codes.tolist(), np.split(positions[order], starts[1:])):
+                buckets.setdefault(code, []).extend(group.tolist())
+
+        self._size = needed
+        self.ids.extend(ids)
+        return positions
+
+    def _candidates(self, projections, probes):
+        """Collect candidate positions for one query's projections (tables, bits)."""
+        codes = self._codes(projections)
+        parts = []
+        for table, buckets in enumerate(self._buckets):
+            code = int(codes[table])
+            probe_codes = [code]
+            if probes:
+                # Flip the bits whose projection was closest to the hyperplane
+                uncertain = np.argsort(np.abs(projections[table]))[:probes]
+                probe_codes.extend(code ^ (1 << int(bit)) for bit in uncertain)
+            for probe_code in probe_codes:
+                bucket = buckets.get(probe_code)
+                if bucket:
+                    parts.append(bucket)
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([np.asarray(p, dtype=np.int64) for p in parts]))
+
+    def query(self, vectors, k=10, threshold=None, probes=1, exclude=None):
+        """
+        Find approximate neighbours for each query vector.
+
+        Args:
+            vectors: Array of shape (n, dim)
+            k: Keep at most this many neighbours per query (None keeps all)
+            threshold: Keep only neighbours with inner product above this
+            probes: Extra buckets probed per table (higher recall, slower)
+            exclude: Optional positions to drop from each query's results,
+                one per query (e.g. the query's own position)
+
+        Returns:
+            List of (positions, similarities) array pairs, best first
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        projections = self._project(vectors)
+        stored = self.vectors
+        results = []
+
+        for row, vector in enumerate(vectors):
+            candidates = self._candidates(projections[row], probes)
+            if exclude is not None:
+                candidates = candidates[candidates != exclude[row]]
+            similarities = stored[candidates] @ vector
+
+            if threshold is not None:
+                keep = similarities > threshold
+                candidates, similarities = candidates[keep], similarities[keep]
+            if k is not None and len(candidates) > k:
+                top = np.argpartition(-similarities, k - 1)[:k]
+                candidates, similarities = candidates[top], similarities[top]
+
+            order = np.argsort(-similarities, kind='stable')
+            results.append((candidates[order], similarities[order]))
+
+        return results
@@ -0,0 +1,124 @@
+"""
+CPU inference profiles for the feature models.
+
+A profile is a set of graph and precision changes applied once after a
+model is loaded:
+
+    fp32      eager float32, unchanged (the default)
+    cpu       int8 dynamic quantization of Linear layers, channels-last
+              activations and a frozen TorchScript graph
+    cpu_fp32  the cpu profile without quantization (no precision change)
+
+Each processor applies the steps that suit its model. Every optimized
+model is checked against the float32 original on fixed inputs, and it is
+only used if the cosine similarity of their outputs stays within the
+allowed drift.
+"""
+
+import copy
+import warnings
+
+import torch
+
+
+INFERENCE_PROFILES = {
+    'fp32': {'quantize': False, 'channels_last': False, 'torchscript': False},
+    'cpu': {'quantize': True, 'channels_last': True, 'torchscript': True},
+    'cpu_fp32': {'quantize': False, 'channels_last': True, 'torchscript': True},
+}
+DEFAULT_MAX_COSINE_DRIFT = 0.01
+
+
+def profile_options(profile):
+    """Steps enabled by a named profile; ValueError for unknown names."""
+    if profile not in INFERENCE_PROFILES:
+        raise ValueError(f"inference_profile must be one of {tuple(INFERENCE_PROFILES)}, got {profile!r}")
+    return INFERENCE_PROFILES[profile]
+
+
+def has_linear_layers(model):
+    return any(isinstance(module, torch.nn.Linear) for module in model.modules())
+
+
+def quantize_linear(model):
+    """Copy of model with Linear layers replaced by int8 dynamic-quantized ones."""
+    with warnings.catch_warnings():
+        # torch.ao.quantization is deprecated in favour of torchao, which
+        # is not a dependency; the eager API still works
+        warnings.simplefilter('ignore')
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class ChannelsLastInput(torch.nn.Module):
+    """Run a convolutional model (a copy of it) with NHWC activations."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = copy.deepcopy(model).to(memory_format=torch.channels_last)
+
+    def forward(self, x):
+        return self.model(x.contiguous(memory_format=torch.channels_last))
+
+
+def freeze_traced(model, example):
+    """
+    Trace model on an example and freeze it for inference.
+
+    torch.jit.optimize_for_inference freezes parameters into the graph,
+    folds batch norms into the preceding convolutions and lets oneDNN
+    pick its preferred layouts. The result keeps no Python attributes,
+    only forward.
+    """
+    with torch.no_grad():
+        traced = torch.jit.trace(model.eval(), example)
+    return torch.jit.optimize_for_inference(traced)
+
+
+def cosine_agreement(reference, candidate):
+    """
+    Row-wise cosine similarity between two output batches.
+
+    Returns:
+        Dictionary with the minimum and mean cosine similarity
+    """
+    reference = reference.detach().float().reshape(reference.shape[0], -1)
+    candidate = candidate.detach().float().reshape(candidate.shape[0], -1)
+    cosine = torch.nn.functional.cosine_similarity(reference, candidate, dim=1)
+    return {'min_cosine': float(cosine.min()), 'mean_cosine': float(cosine.mean())}
+
+
+def apply_profile(name, model, optimize, run, examples, max_cosine_drift=DEFAULT_MAX_COSINE_DRIFT):
+    """
+    Optimize a model and keep the result only if it agrees with the original.
+
+    Args:
+        name: Model name used in messages
+        model: Float32 model in eval mode
+        optimize: Callable returning (optimized model, list of applied steps)
+        run: Callable(model, example) returning a (rows, ...) output tensor
+        examples: Inputs compared between the two models
+        max_cosine_drift: Largest allowed 1 - cosine similarity on any row
+
+    Returns:
+        (model to use, report dictionary)
+    """
+    report = {'applied': False, 'steps': [], 'max_cosine_drift': max_cosine_drift}
+    try:
+        with torch.no_grad():
+            optimized, steps = optimize(model)
+            agreement = [cosine_agreement(run(model, x), run(optimized, x)) for x in examples]
+    except Exception as e:
+        print(f"⚠️ Could not optimize {name} model for CPU, using fp32: {e}")
+        report['error'] = str(e)
+        return model, report
+
+    report['steps'] = steps
+    report['min_cosine'] = min(a['min_cosine'] for a in agreement)
+    report['mean_cosine'] = sum(a['mean_cosine'] for a in agreement) / len(agreement)
+    if 1.0 - report['min_cosine'] > max_cosine_drift:
+        print(f"⚠️ Optimized {name} model drifted to cosine {report['min_cosine']:.6f} "
+              f"(allowed drift {max_cosine_drift}), using fp32")
+        return model, report
+
+    report['applied'] = True
+    return optimized, report
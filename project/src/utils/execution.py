@@ -0,0 +1,216 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import torch
+
+from .metrics import stage
+
+
+def available_cpus():
+    """CPU ids this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_sets(num_workers, cpus=None):
+    """
+    Split CPUs into contiguous, disjoint sets, one per worker process.
+
+    Args:
+        num_workers: Number of sets
+        cpus: CPU ids to split (defaults to available_cpus())
+
+    Returns:
+        List of num_workers lists; with fewer CPUs than workers, sets repeat
+    """
+    cpus = available_cpus() if cpus is None else sorted(cpus)
+    num_workers = max(1, int(num_workers))
+    if len(cpus) < num_workers:
+        return [[cpus[i % len(cpus)]] for i in range(num_workers)]
+    size, extra = divmod(len(cpus), num_workers)
+    sets = []
+    start = 0
+    for i in range(num_workers):
+        end = start + size + (1 if i < extra else 0)
+        sets.append(cpus[start:end])
+        start = end
+    return sets
+
+
+def parse_cpu_list(text):
+    """
+    Parse a CPU list in taskset/cgroup notation, e.g. '0-3,8'.
+
+    Returns:
+        Sorted list of CPU ids, or None for an empty string
+    """
+    cpus = set()
+    for part in (text or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus) or None
+
+
+def affinity_from_environment(environ=None):
+    """
+    CPU set of this process, as set by whatever started it.
+
+    CPU_AFFINITY (e.g. '0-3') names the CPUs directly. Otherwise, when a
+    deployment runs several server processes, WORKER_COUNT and
+    WORKER_INDEX (0-based) select this process's share of core_sets().
+
+    Returns:
+        Sorted list of CPU ids, or None to leave affinity unchanged
+    """
+    environ = os.environ if environ is None else environ
+    cpus = parse_cpu_list(environ.get('CPU_AFFINITY', ''))
+    if cpus is not None or not environ.get('WORKER_COUNT'):
+        return cpus
+    count = int(environ['WORKER_COUNT'])
+    index = int(environ.get('WORKER_INDEX', 0))
+    if not 0 <= index < count:
+        raise ValueError(f"WORKER_INDEX must be in [0, {count}), got {index}")
+    return core_sets(count)[index]
+
+
+def pin_to_cores(cores):
+    """
+    Restrict the calling thread, and threads it starts later, to CPU ids.
+
+    Linux applies affinity per thread, so call this from the main thread
+    before any worker threads or processes are started.
+
+    Returns:
+        False where the platform does not support affinity
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        print("⚠️ CPU affinity is not supported on this platform")
+        return False
+    os.sched_setaffinity(0, set(cores))
+    return True
+
+
+class ExecutionConfig:
+    """
+    CPU resources for model inference, shared by every processor.
+
+    Without it, each concurrent request runs its forward pass with torch's
+    default thread pool sized to all cores, so a few simultaneous requests
+    oversubscribe the CPU and tail latency collapses. An ExecutionConfig
+    bounds how many forward passes run at once (overall and per model) and
+    gives each one a fixed intra-op thread budget, so that
+    max_concurrent_inferences x threads roughly matches the cores this
+    process owns.
+
+    The thread budget, inter-op pool size and CPU affinity are set once
+    by apply(), which should run before any model is used. torch's thread
+    count is process-wide, so a per-model override in model_threads is set
+    when that model is invoked and left in place, never restored per call.
+    Per-model budgets therefore only hold when calls are serialized
+    (max_concurrent_inferences=1) or each model runs in its own process;
+    when calls with different budgets overlap, the last one set applies
+    to all of them.
+    """
+
+    def __init__(self, max_concurrent_inferences=None, intra_op_threads=None,
+                 inter_op_threads=None, model_threads=None, model_concurrency=None,
+                 cpu_affinity=None):
+        """
+        Initialize execution settings.
+
+        Args:
+            max_concurrent_inferences: Forward passes allowed at once across
+                all models (None for no limit)
+            intra_op_threads: Threads per forward pass; None divides the
+                available cores by max_concurrent_inferences (or leaves
+                torch's default without a limit)
+            inter_op_threads: Size of torch's inter-op pool (None leaves it)
+            model_threads: Optional {model name: intra-op threads} overrides
+            model_concurrency: Optional {model name: concurrent passes} limits
+            cpu_affinity: CPU ids to pin this process to (None leaves it)
+        """
+        self.cpu_affinity = sorted(cpu_affinity) if cpu_affinity is not None else None
+        cpus = len(self.cpu_affinity) if self.cpu_affinity else len(available_cpus())
+
+        self.max_concurrent_inferences = max_concurrent_inferences
+        if intra_op_threads is None and max_concurrent_inferences:
+            intra_op_threads = max(1, cpus // max_concurrent_inferences)
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.model_threads = dict(model_threads or {})
+        self.model_concurrency = dict(model_concurrency or {})
+
+        self._global_slots = (threading.BoundedSemaphore(max_concurrent_inferences)
+                              if max_concurrent_inferences else None)
+        self._model_slots = {name: threading.BoundedSemaphore(limit)
+                             for name, limit in self.model_concurrency.items()}
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def apply(self):
+        """Apply the process-wide settings: affinity, intra-op and inter-op threads."""
+        if self.cpu_affinity:
+            pin_to_cores(self.cpu_affinity)
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+        if self.inter_op_threads:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError as e:
+                # Only allowed before the first inter-op parallel work
+                print(f"⚠️ Could not set inter-op threads: {e}")
+        return self
+
+    def threads_for(self, model_name):
+        """Intra-op thread budget of one model's forward pass (None for torch's default)."""
+        return self.model_threads.get(model_name, self.intra_op_threads)
+
+    @contextmanager
+    def invoke(self, model_name):
+        """
+        Run one forward pass of a model within the configured limits.
+
+        Waits for a free slot (the wait is recorded as the
+        '<model>_inference_wait' stage), then runs the block. The model's
+        own slot is taken before a global one, so a call queued behind its
+        model's limit never holds a global slot that another model could
+        use. A model_threads override is applied if it differs from the
+        current thread count, and stays in effect afterwards.
+        """
+        slots = [s for s in (self._model_slots.get(model_name), self._global_slots) if s is not None]
+        with stage(f'{model_name}_inference_wait'):
+            for slot in slots:
+                slot.acquire()
+        self._count(model_name, 'running', 1)
+        try:
+            threads = self.threads_for(model_name)
+            if threads and threads != torch.get_num_threads():
+                torch.set_num_threads(threads)
+            yield
+        finally:
+            self._count(model_name, 'running', -1)
+            self._count(model_name, 'invocations', 1)
+            for slot in reversed(slots):
+                slot.release()
+
+    def _count(self, model_name, name, amount):
+        with self._lock:
+            counters = self._counters.setdefault(model_name, {'running': 0, 'invocations': 0})
+            counters[name] += amount
+
+    def stats(self):
+        """Limits, thread budgets and per-model invocation counters."""
+        with self._lock:
+            models = {name: dict(counters) for name, counters in self._counters.items()}
+        return {
+            'cpus': len(available_cpus()),
+            'max_concurrent_inferences': self.max_concurrent_inferences,
+            'intra_op_threads': self.intra_op_threads or torch.get_num_threads(),
+            'inter_op_threads': self.inter_op_threads or torch.get_num_interop_threads(),
+            'models': models,
+        }
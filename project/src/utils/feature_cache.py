@@ -0,0 +1,250 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FeatureCache:
+    """
+    Content-addressed cache for extracted feature arrays.
+
+    Keys combine a hash of the raw file bytes with a namespace describing
+    the model and preprocessing that produced the features, so a repeat
+    upload costs one hash instead of a forward pass. Entries live in an
+    in-memory LRU tier and, optionally, an on-disk tier of .npy files that
+    is trimmed oldest-first once it grows past its byte limit.
+    """
+
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, max_memory_items=512, max_memory_bytes=256 * 1024 * 1024,
+                 disk_dir=None, max_disk_bytes=2 * 1024 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_memory_items: Maximum number of arrays kept in memory
+            max_memory_bytes: Maximum total size of in-memory arrays
+            disk_dir: Directory for the on-disk tier (None disables it)
+            max_disk_bytes: Maximum total size of the on-disk tier
+        """
+        self.max_memory_items = max_memory_items
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'puts': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+            'hashed_bytes': 0,
+        }
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    def content_hash(self, source):
+        """
+        Hash the raw bytes of a file.
+
+        Args:
+            source: Path, bytes-like object or seekable file-like object.
+                File-like objects are rewound to their original position.
+
+        Returns:
+            Hex digest string
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        hashed = 0
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            digest.update(source)
+            hashed = len(source)
+        elif isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    hashed += len(chunk)
+        else:
+            position = source.tell()
+            for chunk in iter(lambda: source.read(self.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                hashed += len(chunk)
+            source.seek(position, io.SEEK_SET)
+
+        with self._lock:
+            self._counters['hashed_bytes'] += hashed
+        return digest.hexdigest()
+
+    def make_key(self, source, namespace):
+        """Build the cache key for a file under a model/transform namespace."""
+        namespace_hash = hashlib.blake2b(namespace.encode('utf-8'), digest_size=8).hexdigest()
+        return f"{namespace_hash}-{self.content_hash(source)}"
+
+    def get(self, key):
+        """
+        Look up a cached array.
+
+        Returns:
+            Read-only numpy array, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counters['memory_hits'] += 1
+                return self._memory[key]
+            on_disk = key in self._disk
+
+        if on_disk:
+            path = self._disk_path(key)
+            try:
+                array = np.load(path, allow_pickle=False)
+                os.utime(path)
+            except (OSError, ValueError):
+                with self._lock:
+                    self._drop_disk_entry(key)
+            else:
+                array.flags.writeable = False
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._counters['disk_hits'] += 1
+                    self._store_in_memory(key, array)
+                return array
+
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def put(self, key, array):
+        """Store an array in both tiers and return the cached (read-only) copy."""
+        array = np.array(array, copy=True)
+        array.flags.writeable = False
+
+        with self._lock:
+            self._counters['puts'] += 1
+            self._store_in_memory(key, array)
+
+        if self.disk_dir:
+            self._write_disk(key, array)
+        return array
+
+    def get_or_compute(self, source, namespace, compute):
+        """
+        Return cached features for source, computing and storing them on a miss.
+
+        Args:
+            source: Path, bytes or file-like object with the raw file contents
+            namespace: Model/transform version string
+            compute: Callable taking source and returning a numpy array
+
+        Returns:
+            Read-only numpy array
+        """
+        key = self.make_key(source, namespace)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        return self.put(key, compute(source))
+
+    def stats(self):
+        """Return hit/miss counters and byte usage for both tiers."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['hits'] = stats['memory_hits'] + stats['disk_hits']
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+            stats['memory_items'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+            stats['disk_items'] = len(self._disk)
+            stats['disk_bytes'] = self._disk_bytes
+        return stats
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for key in list(self._disk):
+                self._drop_disk_entry(key)
+
+    def _store_in_memory(self, key, array):
+        """Insert into the LRU tier and evict down to the limits (lock held)."""
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key).nbytes
+        if array.nbytes > self.max_memory_bytes:
+            return
+        self._memory[key] = array
+        self._memory_bytes += array.nbytes
+        while (len(self._memory) > self.max_memory_items
+               or self._memory_bytes > self.max_memory_bytes):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self._counters['memory_evictions'] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[-2:], f"{key}.npy")
+
+    def _write_disk(self, key, array):
+        """Atomically write an entry to disk and trim the tier to its limit."""
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"⚠️ Feature cache write failed: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)
+            self._disk[key] = size
+            self._disk_bytes += size
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                oldest = next(iter(self._disk))
+                self._drop_disk_entry(oldest)
+                self._counters['disk_evictions'] += 1
+
+    def _drop_disk_entry(self, key):
+        """Forget a disk entry and delete its file (lock held)."""
+        size = self._disk.pop(key, None)
+        if size is None:
+            return
+        self._disk_bytes -= size
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _scan_disk(self):
+        """Rebuild the disk index from files left by a previous process."""
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                elif name.endswith('.npy'):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, name[:-len('.npy')], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
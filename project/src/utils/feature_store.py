@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+
+class FeatureStore:
+    """
+    Append-only store of fixed-width float32 feature vectors.
+
+    Vectors are appended as raw rows to a single file that readers map
+    with np.memmap, so slices and whole-store scans are zero-copy and the
+    store can be far larger than memory. A parallel text file records the
+    id of every row; it is loaded into a dictionary for random access by
+    id. Re-appending an id shadows its earlier row.
+
+    Layout of the store directory:
+        meta.json    {"dim": d, "dtype": "float32"}
+        vectors.f32  n x d little-endian float32 rows
+        ids.txt      one id per line, row order
+
+    Rows are written before their ids, so a crash can only leave a torn
+    tail, which the next writer trims. One process may append at a time;
+    other processes can open the store with mode='r' and call refresh()
+    to pick up new rows.
+    """
+
+    DTYPE = np.dtype('<f4')
+    META_FILE = 'meta.json'
+    VECTORS_FILE = 'vectors.f32'
+    IDS_FILE = 'ids.txt'
+
+    def __init__(self, directory, dim=None, mode='a'):
+        """
+        Open or create a store.
+
+        Args:
+            directory: Store directory (created for mode='a')
+            dim: Vector width; None takes it from the store or the first append
+            mode: 'a' to read and append, 'r' for read-only access
+        """
+        if mode not in ('a', 'r'):
+            raise ValueError(f"mode must be 'a' or 'r', got {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        self._lock = threading.RLock()
+        self._ids = []
+        self._positions = {}
+        self._mapped = None
+        self._ids_bytes = 0
+
+        stored_dim = self._read_meta()
+        if stored_dim is not None and dim is not None and int(dim) != stored_dim:
+            raise ValueError(f"Feature store {directory} holds {stored_dim}-d vectors, not {dim}-d")
+        self.dim = stored_dim if stored_dim is not None else (int(dim) if dim is not None else None)
+
+        if mode == 'a':
+            os.makedirs(directory, exist_ok=True)
+            if stored_dim is None and self.dim is not None:
+                self._write_meta()
+        elif stored_dim is None:
+            raise FileNotFoundError(f"No feature store in {directory}")
+        self.refresh()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._path(self.META_FILE)) as f:
+                return int(json.load(f)['dim'])
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self):
+        tmp_path = self._path(f"{self.META_FILE}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'dim': self.dim, 'dtype': 'float32'}, f)
+        os.replace(tmp_path, self._path(self.META_FILE))
+
+    def refresh(self):
+        """
+        Load ids appended since the last call (by this or another process).
+
+        In append mode, a torn tail left by an interrupted write is trimmed.
+
+        Returns:
+            Number of rows in the store
+        """
+        with self._lock:
+            ids_path = self._path(self.IDS_FILE)
+            if os.path.exists(ids_path):
+                with open(ids_path, 'rb') as f:
+                    f.seek(self._ids_bytes)
+                    tail = f.read()
+                # Only complete lines count; a partial one is still being written
+                complete = tail[:tail.rfind(b'\n') + 1]
+                for item_id in complete.decode('utf-8').splitlines():
+                    self._positions[item_id] = len(self._ids)
+                    self._ids.append(item_id)
+                self._ids_bytes += len(complete)
+                if self.mode == 'a' and len(complete) < len(tail):
+                    os.truncate(ids_path, self._ids_bytes)
+
+            if self.dim is None:
+                return 0
+            row_bytes = self.dim * self.DTYPE.itemsize
+            vectors_path = self._path(self.VECTORS_FILE)
+            rows = os.path.getsize(vectors_path) // row_bytes if os.path.exists(vectors_path) else 0
+            if rows < len(self._ids):
+                if self.mode == 'r':
+                    # Ids are written after rows, so this only happens mid-repair
+                    raise ValueError(f"Feature store {self.directory} has more ids than vectors")
+                self._truncate(rows)
+            elif rows > len(self._ids) and self.mode == 'a':
+                os.truncate(vectors_path, len(self._ids) * row_bytes)
+            return len(self._ids)
+
+    def _truncate(self, rows):
+        """Drop ids beyond the given row count (lock held)."""
+        self._ids = self._ids[:rows]
+        self._positions = {item_id: i for i, item_id in enumerate(self._ids)}
+        data = ''.join(f"{item_id}\n" for item_id in self._ids).encode('utf-8')
+        tmp_path = self._path(f"{self.IDS_FILE}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(self.IDS_FILE))
+        self._ids_bytes = len(data)
+        self._mapped = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, item_id):
+        return item_id in self._positions
+
+    @property
+    def ids(self):
+        """Ids in row order (a copy)."""
+        with self._lock:
+            return list(self._ids)
+
+    def append(self, ids, vectors):
+        """
+        Append vectors with their ids.
+
+        Args:
+            ids: One string id per row (no newlines)
+            vectors: Array-like of shape (len(ids), dim), or (dim,) for one id
+
+        Returns:
+            Row index of the first appended vector
+        """
+        if self.mode != 'a':
+            raise ValueError("Feature store is opened read-only")
+        ids = [str(item_id) for item_id in ids]
+        for item_id in ids:
+            if '\n' in item_id or '\r' in item_id:
+                raise ValueError(f"Feature ids cannot contain line breaks: {item_id!r}")
+        vectors = np.ascontiguousarray(vectors, dtype=self.DTYPE).reshape(len(ids), -1)
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._write_meta()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Feature store holds {self.dim}-d vectors, got {vectors.shape[1]}-d"
+                )
+            start = len(self._ids)
+            if not ids:
+                return start
+
+            with open(self._path(self.VECTORS_FILE), 'ab') as f:
+                f.write(vectors.tobytes())
+            data = ''.join(f"{item_id}\n" for item_id in ids).encode('utf-8')
+            with open(self._path(self.IDS_FILE), 'ab') as f:
+                f.write(data)
+            self._ids_bytes += len(data)
+
+            for offset, item_id in enumerate(ids):
+                self._positions[item_id] = start + offset
+            self._ids.extend(ids)
+            return start
+
+    def vectors(self):
+        """
+        Every stored vector as a read-only (n, dim) array.
+
+        The array is a memory map of the vectors file, so nothing is read
+        until it is touched; slice it rather than copying it.
+        """
+        with self._lock:
+            n = len(self._ids)
+            if self._mapped is None or len(self._mapped) != n:
+                if n == 0:
+                    self._mapped = np.empty((0, self.dim or 0), dtype=self.DTYPE)
+                else:
+                    self._mapped = np.memmap(self._path(self.VECTORS_FILE), dtype=self.DTYPE,
+                                             mode='r', shape=(n, self.dim))
+            return self._mapped
+
+    def row(self, item_id):
+        """Zero-copy (dim,) view of one id's vector; KeyError if unknown."""
+        return self.vectors()[self._positions[item_id]]
+
+    def get(self, ids):
+        """
+        Vectors for several ids, in the order given.
+
+        Returns:
+            New (len(ids), dim) array
+
+        Raises:
+            KeyError: An id is not in the store
+        """
+        positions = np.fromiter((self._positions[item_id] for item_id in ids), dtype=np.int64)
+        # Fancy indexing the memory map reads only the requested rows
+        return np.array(self.vectors()[positions], dtype=self.DTYPE)
+
+    def iter_blocks(self, block_size=65536):
+        """
+        Scan the store in row blocks.
+
+        Yields:
+            (ids, vectors) with vectors a zero-copy slice of at most block_size rows
+        """
+        vectors = self.vectors()
+        ids = self.ids[:len(vectors)]
+        for start in range(0, len(vectors), block_size):
+            yield ids[start:start + block_size], vectors[start:start + block_size]
+
+    def stats(self):
+        """Row count, width and size on disk."""
+        with self._lock:
+            return {
+                'rows': len(self._ids),
+                'unique_ids': len(self._positions),
+                'dim': self.dim,
+                'bytes': len(self._ids) * (self.dim or 0) * self.DTYPE.itemsize,
+            }
@@ -2,76 +2,279 @@ import networkx as nx
 import pandas as pd
 import numpy as np
 
+from .similarity import iter_similar_pairs
+from . import sparse_graph
+
+
+# Absolute correlation below which features are not linked by default
+DEFAULT_CORRELATION_THRESHOLD = 0.5
 
 class GraphAnalyzer:
     def __init__(self):
         """Initialize graph analyzer."""
         pass
     
-    def analyze_relationships(self, data_df):
+    def analyze_relationships(self, data_df, threshold=DEFAULT_CORRELATION_THRESHOLD,
+                              block_size=2048, return_graph=False):
         """
         Analyze relationships in data using graph theory.
         
+        Metrics are computed on a sparse (CSR) adjacency of the feature
+        correlation graph with vectorized SciPy operations; a NetworkX graph
+        is only built when return_graph is set.
+        
+        data_df may also be a 2-D array such as FeatureStore.vectors(); its
+        columns are then named by position and the correlation matrix is
+        accumulated over row blocks, so millions of memory-mapped rows are
+        streamed rather than loaded. Arrays must not contain NaN.
+        
         Args:
-            data_df: pandas DataFrame with features
+            data_df: pandas DataFrame or 2-D array with features
+            threshold: Link only features whose absolute correlation exceeds
+                this; the correlation matrix is then computed in tiles and
+                never held whole. None opts into the legacy dense output:
+                every pair with nonzero correlation is linked (a complete
+                graph, with self-loops)
+            block_size: Features per tile when thresholding
+            return_graph: Also return the NetworkX graph under 'graph'
             
         Returns:
             Dictionary with graph analysis results
         """
         # Create graph from correlation matrix
-        corr_matrix = data_df.corr().abs()
-        G = nx.from_pandas_adjacency(corr_matrix)
+        if isinstance(data_df, pd.DataFrame):
+            columns = list(data_df.columns)
+        else:
+            columns = list(range(np.shape(data_df)[1]))
+        adjacency = self._correlation_adjacency(data_df, threshold, block_size=block_size)
         
         # Calculate centrality measures
-        centrality = nx.degree_centrality(G)
-        clustering = nx.clustering(G)
+        centrality = list(zip(columns, sparse_graph.degree_centrality(adjacency).tolist()))
+        clustering = sparse_graph.clustering(adjacency)
+        num_components = sparse_graph.connected_components(adjacency)[0] if columns else 0
         
         # Find most central nodes
-        most_central = sorted(centrality.items(), key=lambda x: x[1], reverse=True)[:5]
+        most_central = sorted(centrality, key=lambda x: x[1], reverse=True)[:5]
         
-        return {
-            'centrality': dict(list(centrality.items())[:10]),  # First 10 for brevity
-            'clustering': dict(list(clustering.items())[:10]),
-            'connected_components': nx.number_connected_components(G),
-            'density': nx.density(G),
+        result = {
+            'centrality': dict(centrality[:10]),  # First 10 for brevity
+            'clustering': dict(zip(columns[:10], clustering[:10].tolist())),
+            'connected_components': int(num_components),
+            'density': sparse_graph.density(adjacency),
             'most_central_nodes': most_central,
-            'average_clustering': nx.average_clustering(G)
+            'average_clustering': float(clustering.mean()) if columns else 0.0
         }
+        if return_graph:
+            result['graph'] = sparse_graph.to_networkx(adjacency, columns)
+        return result
     
-    def build_feature_graph(self, data_df, threshold=0.7):
+    def _correlation_adjacency(self, data_df, threshold=None, dtype=np.float64, block_size=None):
+        """
+        Sparse adjacency of absolute feature correlations.
+        
+        Args:
+            data_df: pandas DataFrame or 2-D array
+            threshold: Keep pairs above this (None keeps every nonzero
+                entry of the matrix, diagonal included)
+            dtype: Floating point type for the computation
+            block_size: Features per tile (None computes a single tile)
+            
+        Returns:
+            scipy.sparse CSR matrix, one row per column of data_df
+        """
+        n = data_df.shape[1]
+        if not isinstance(data_df, pd.DataFrame):
+            if threshold is None:
+                corr = np.abs(self._streaming_correlation(data_df, dtype))
+                rows, cols = np.nonzero(np.triu(corr != 0))
+                return sparse_graph.adjacency_from_pairs(n, rows, cols, corr[rows, cols])
+            pairs = []
+            for start, strip in self._iter_correlation_strips(data_df, dtype, block_size):
+                strip = np.abs(strip)
+                rows, cols = np.nonzero(strip > threshold)
+                # Strip columns start at feature `start`; keep the upper triangle
+                rows += start
+                cols += start
+                upper = cols > rows
+                rows, cols = rows[upper], cols[upper]
+                pairs.append((rows, cols, strip[rows - start, cols - start]))
+            if not pairs:
+                return sparse_graph.adjacency_from_pairs(n, [], [])
+            rows, cols, weights = (np.concatenate(parts) for parts in zip(*pairs))
+            return sparse_graph.adjacency_from_pairs(n, rows, cols, weights)
+        
+        if threshold is None:
+            corr = np.abs(data_df.corr().to_numpy(dtype=dtype))
+            rows, cols = np.nonzero(np.triu(corr != 0))
+            return sparse_graph.adjacency_from_pairs(n, rows, cols, corr[rows, cols])
+        
+        values = data_df.to_numpy(dtype=dtype)
+        if np.isnan(values).any():
+            # pandas handles missing values with pairwise-complete correlations
+            corr = np.abs(data_df.corr().to_numpy(dtype=dtype))
+            rows, cols = np.nonzero(np.triu(corr > threshold, k=1))
+            return sparse_graph.adjacency_from_pairs(n, rows, cols, corr[rows, cols])
+        
+        vectors = self._standardized_columns(values)
+        tile = block_size or max(1, vectors.shape[0])
+        pairs = list(iter_similar_pairs(vectors, threshold, tile, absolute=True))
+        if not pairs:
+            return sparse_graph.adjacency_from_pairs(n, [], [])
+        rows, cols, weights = (np.concatenate(parts) for parts in zip(*pairs))
+        return sparse_graph.adjacency_from_pairs(n, rows, cols, weights)
+    
+    def build_feature_graph(self, data_df, threshold=0.7, dtype=np.float64, block_size=None):
         """
         Build graph based on feature correlations.
         
+        Correlations are computed as a matrix product of the standardized
+        columns and thresholded in bulk. Passing block_size computes the
+        correlation matrix in tiles of that many features, so the full d x d
+        matrix is never materialized; dtype=np.float32 halves memory again.
+        2-D arrays are streamed by row block as in analyze_relationships,
+        once per tile of block_size features.
+        
         Args:
-            data_df: pandas DataFrame
+            data_df: pandas DataFrame or 2-D array
             threshold: Correlation threshold for edge creation
+            dtype: Floating point type for the computation
+            block_size: Features per tile (None computes a single tile)
             
         Returns:
             NetworkX Graph
         """
-        corr_matrix = data_df.corr().abs()
-        G = nx.Graph()
+        # Nodes are features; edges join highly correlated pairs
+        adjacency = self._correlation_adjacency(data_df, threshold, dtype, block_size)
+        if isinstance(data_df, pd.DataFrame):
+            return sparse_graph.to_networkx(adjacency, list(data_df.columns))
+        return sparse_graph.to_networkx(adjacency)
+    
+    @staticmethod
+    def _standardized_columns(values):
+        """
+        Return one row per column, scaled so that row dot products are
+        Pearson correlations. Constant columns become NaN rows and so never
+        pass a threshold, matching pandas.
+        """
+        centered = values - values.mean(axis=0)
+        norms = np.sqrt(np.einsum('ij,ij->j', centered, centered))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(norms > 0, 1.0 / norms, np.nan).astype(values.dtype)
+        return (centered * scale).T
+    
+    @staticmethod
+    def _shifted_blocks(values, shift, dtype, block_rows):
+        for start in range(0, values.shape[0], block_rows):
+            yield np.asarray(values[start:start + block_rows], dtype=dtype) - shift
+    
+    @classmethod
+    def _iter_correlation_strips(cls, values, dtype=np.float64, block_size=None, block_rows=65536):
+        """
+        Pearson correlations of the columns of a 2-D array, one strip at a time.
         
-        # Add nodes (features)
-        for col in corr_matrix.columns:
-            G.add_node(col)
+        A first pass over blocks of rows accumulates column sums and sums of
+        squares. Then, for each tile of block_size features, another pass
+        accumulates that tile's Gram matrix against every later feature.
+        Only one block of rows and one strip are in memory at a time, never
+        the whole d x d matrix. Rows are shifted by the first block's mean,
+        which keeps the one-pass covariance from cancelling catastrophically.
+        Constant columns get NaN correlations, matching pandas.
         
-        # Add edges for high correlations
-        for i, col1 in enumerate(corr_matrix.columns):
-            for j, col2 in enumerate(corr_matrix.columns):
-                if i < j and corr_matrix.loc[col1, col2] > threshold:
-                    G.add_edge(col1, col2, weight=corr_matrix.loc[col1, col2])
+        Yields:
+            (start, strip) where strip[i, j] is the correlation of features
+            start + i and start + j, for features from start to d
+        """
+        n, d = values.shape
+        shift = np.asarray(values[:block_rows], dtype=dtype).mean(axis=0) if n else np.zeros(d, dtype)
+        sums = np.zeros(d, dtype=dtype)
+        squares = np.zeros(d, dtype=dtype)
+        for block in cls._shifted_blocks(values, shift, dtype, block_rows):
+            sums += block.sum(axis=0)
+            squares += np.einsum('ij,ij->j', block, block)
         
-        return G
+        mean = sums / max(n, 1)
+        std = np.sqrt(np.clip(squares - n * mean * mean, 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(std > 0, 1.0 / std, np.nan)
+        
+        tile = block_size or max(d, 1)
+        for start in range(0, d, tile):
+            end = min(start + tile, d)
+            gram = np.zeros((end - start, d - start), dtype=dtype)
+            for block in cls._shifted_blocks(values, shift, dtype, block_rows):
+                gram += block[:, start:end].T @ block[:, start:]
+            cov = gram - n * np.outer(mean[start:end], mean[start:])
+            strip = cov * scale[start:end, None] * scale[None, start:]
+            np.clip(strip, -1.0, 1.0, out=strip)
+            yield start, strip
+    
+    @classmethod
+    def _streaming_correlation(cls, values, dtype=np.float64, block_rows=65536):
+        """Full Pearson correlation matrix of the columns of a 2-D array (see _iter_correlation_strips)."""
+        for _, corr in cls._iter_correlation_strips(values, dtype, block_rows=block_rows):
+            return corr
+        return np.zeros((0, 0), dtype=dtype)
     
-    def find_communities(self, graph):
-        """Find communities in the graph using greedy modularity."""
+    def find_communities(self, graph, method='label_propagation', seed=0, max_iter=100,
+                         time_budget=None, weight='weight'):
+        """
+        Find communities in the graph.
+        
+        The default backend runs weighted label propagation on a CSR
+        adjacency and scales to graphs with hundreds of thousands of nodes;
+        'greedy_modularity' is NetworkX's greedy modularity maximization,
+        which is slower but usually finds higher-modularity partitions on
+        small graphs.
+        
+        Args:
+            graph: NetworkX graph, or a symmetric scipy.sparse adjacency
+                (nodes are then its row indices)
+            method: 'label_propagation' or 'greedy_modularity'
+            seed: Random seed for label propagation
+            max_iter: Label propagation iteration budget
+            time_budget: Optional label propagation budget in seconds
+            weight: Edge attribute used as weight (None for unweighted)
+            
+        Returns:
+            Dictionary with the communities (largest first), their count
+            and the partition's modularity
+        """
         try:
-            communities = nx.community.greedy_modularity_communities(graph)
-            return {
-                'num_communities': len(communities),
-                'communities': [list(comm) for comm in communities]
-            }
-        except:
-            return {'error': 'Could not compute communities'}
+            if isinstance(graph, nx.Graph):
+                nodes = list(graph.nodes())
+                adjacency = nx.to_scipy_sparse_array(graph, nodelist=nodes, weight=weight, format='csr')
+            else:
+                adjacency = graph
+                nodes = list(range(adjacency.shape[0]))
+            
+            if method == 'label_propagation':
+                labels, iterations, converged = sparse_graph.label_propagation(
+                    adjacency, seed=seed, max_iter=max_iter, time_budget=time_budget
+                )
+                details = {'iterations': iterations, 'converged': converged}
+            elif method == 'greedy_modularity':
+                G = graph if isinstance(graph, nx.Graph) else sparse_graph.to_networkx(adjacency)
+                position = {node: i for i, node in enumerate(nodes)}
+                labels = np.empty(len(nodes), dtype=np.int64)
+                for label, community in enumerate(
+                        nx.community.greedy_modularity_communities(G, weight=weight)):
+                    labels[[position[node] for node in community]] = label
+                details = {}
+            else:
+                raise ValueError(f"Unknown community detection method: {method!r}")
+        except (nx.NetworkXError, ValueError) as e:
+            return {'error': f"Could not compute communities: {e}"}
+        
+        # Group node positions by label, largest community first
+        order = np.argsort(labels, kind='stable')
+        sizes = np.bincount(labels)
+        groups = np.split(order, np.cumsum(sizes)[:-1]) if len(labels) else []
+        groups.sort(key=len, reverse=True)
+        
+        return dict({
+            'num_communities': len(groups),
+            'communities': [[nodes[i] for i in group] for group in groups],
+            'modularity': sparse_graph.modularity(adjacency, labels),
+            'method': method
+        }, **details)
 
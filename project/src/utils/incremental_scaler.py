@@ -0,0 +1,184 @@
+import json
+import os
+
+import numpy as np
+from filelock import FileLock
+
+from .running_stats import RunningMoments
+
+
+class IncrementalScaler:
+    """
+    Standardize features with running statistics updated from every batch.
+
+    Mirrors the parts of sklearn's StandardScaler that DataIntegrator uses
+    (fit, partial_fit, transform, mean_, var_, scale_), but its state is a
+    mergeable RunningMoments: scalers fitted on separate shards can be
+    combined exactly with merge(), and several worker processes can pool
+    what they have seen through a shared state file with sync().
+    """
+
+    def __init__(self):
+        """Initialize an unfitted scaler."""
+        self._moments = None
+        # Statistics seen since the last sync(), so nothing is merged twice
+        self._pending = None
+
+    @property
+    def is_fitted(self):
+        return self._moments is not None and self._moments.count > 0
+
+    @property
+    def n_samples_seen_(self):
+        return self._moments.count if self._moments is not None else 0
+
+    @property
+    def n_features_in_(self):
+        return self._moments.shape[0] if self._moments is not None else 0
+
+    @property
+    def mean_(self):
+        return self._moments.mean
+
+    @property
+    def var_(self):
+        return self._moments.variance()
+
+    @property
+    def scale_(self):
+        scale = np.sqrt(self.var_)
+        # Constant features are left unscaled, as in StandardScaler
+        scale[scale < 10 * np.finfo(np.float64).eps] = 1.0
+        return scale
+
+    def _check_width(self, X):
+        if self._moments is not None and X.shape[1] != self._moments.shape[0]:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but IncrementalScaler is expecting "
+                f"{self._moments.shape[0]} features as input."
+            )
+
+    def partial_fit(self, X):
+        """
+        Update the running mean and variance with a batch of rows.
+
+        Args:
+            X: Array of shape (rows, features)
+
+        Returns:
+            self
+        """
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        self._check_width(X)
+        if self._moments is None:
+            self._moments = RunningMoments((X.shape[1],))
+            self._pending = RunningMoments((X.shape[1],))
+        self._moments.update(X)
+        self._pending.update(X)
+        return self
+
+    def fit(self, X):
+        """Discard any state and fit on X."""
+        self._moments = None
+        self._pending = None
+        return self.partial_fit(X)
+
+    def transform(self, X, copy=True):
+        """
+        Standardize rows with the current statistics.
+
+        Args:
+            X: Array of shape (rows, features)
+            copy: If False and X is a float array, scale it in place
+
+        Returns:
+            Scaled array with X's floating dtype (float64 otherwise)
+        """
+        if not self.is_fitted:
+            raise ValueError("IncrementalScaler is not fitted yet")
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        self._check_width(X)
+
+        if not np.issubdtype(X.dtype, np.floating):
+            X = X.astype(np.float64)
+        elif copy:
+            X = X.copy()
+        X -= self.mean_.astype(X.dtype)
+        X /= self.scale_.astype(X.dtype)
+        return X
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+    def merge(self, other):
+        """
+        Fold in the statistics of another scaler, e.g. one fitted on a
+        parallel shard. The result equals fitting on both shards' rows.
+
+        Merged rows count as the other scaler's, not as rows seen here:
+        they are not passed on by this scaler's next sync(), so shards that
+        each sync to the same file are not counted twice there.
+        """
+        if other._moments is None:
+            return self
+        if self._moments is None:
+            self._moments = RunningMoments(other._moments.shape)
+            self._pending = RunningMoments(other._moments.shape)
+        self._moments.merge(other._moments)
+        return self
+
+    def to_dict(self):
+        """Serialize the statistics to a JSON-compatible dictionary."""
+        return {'moments': self._moments.to_dict() if self._moments is not None else None}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild a scaler produced by to_dict."""
+        scaler = cls()
+        if state.get('moments') is not None:
+            scaler._moments = RunningMoments.from_dict(state['moments'])
+            scaler._pending = RunningMoments(scaler._moments.shape)
+        return scaler
+
+    def save(self, path):
+        """Atomically write the statistics to a JSON file."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a scaler written by save."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def sync(self, path):
+        """
+        Pool statistics with other processes through a shared state file.
+
+        Under a file lock, the rows passed to partial_fit since the last
+        sync are merged into the file's statistics, the result is written
+        back, and this scaler adopts the pooled statistics (replacing
+        anything merged in with merge()).
+
+        Args:
+            path: Shared JSON state file (created if missing)
+
+        Returns:
+            self
+        """
+        with FileLock(f"{path}.lock"):
+            shared = IncrementalScaler.load(path) if os.path.exists(path) else IncrementalScaler()
+            if self._pending is not None and self._pending.count:
+                shared.merge(IncrementalScaler.from_dict({'moments': self._pending.to_dict()}))
+            shared.save(path)
+
+        self._moments = shared._moments
+        if self._moments is not None:
+            self._pending = RunningMoments(self._moments.shape)
+        return self
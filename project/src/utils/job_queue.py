@@ -0,0 +1,250 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+
+JOB_STATES = ('queued', 'running', 'completed', 'failed')
+
+
+class QueueFullError(RuntimeError):
+    """Raised by BatchingJobQueue.submit when the queue is at capacity."""
+
+
+class QueueClosedError(RuntimeError):
+    """Raised by BatchingJobQueue.submit after shutdown."""
+
+
+class Job:
+    """One submitted payload and its lifecycle."""
+
+    def __init__(self, payload, callback=None):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.callback = callback
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.batch_size = None
+        self._enqueued = time.monotonic()
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        """JSON-compatible status, including the result once completed."""
+        info = {
+            'job_id': self.id,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'batch_size': self.batch_size,
+        }
+        if self.status == 'completed':
+            info['result'] = self.result
+        elif self.status == 'failed':
+            info['error'] = self.error
+        return info
+
+
+class BatchingJobQueue:
+    """
+    Bounded in-process job queue drained by a pool of batching workers.
+
+    Workers take up to max_batch_size queued jobs at a time, waiting at
+    most max_wait_seconds after the oldest one arrived for a batch to
+    fill, and hand all their payloads to handler in one call. handler must
+    return one result per payload; returning an Exception instance for an
+    item fails only that job, while raising fails the whole batch.
+
+    submit raises QueueFullError once max_queue_size jobs are waiting, so
+    callers can push back on clients instead of piling up work. Finished
+    jobs are kept for polling until max_retained_jobs newer ones finish;
+    only their status, result and error are kept, and their payload is
+    released once the handler returns.
+
+    With num_workers=0 no threads are started and run_pending drains the
+    queue on the calling thread, which keeps the queue easy to exercise
+    in-process.
+    """
+
+    def __init__(self, handler, max_batch_size=8, max_wait_seconds=0.05,
+                 num_workers=1, max_queue_size=64, max_retained_jobs=1024):
+        """
+        Initialize the queue and start its workers.
+
+        Args:
+            handler: Callable taking a list of payloads, returning a list of results
+            max_batch_size: Most jobs handed to handler at once
+            max_wait_seconds: Longest a job waits for its batch to fill
+            num_workers: Worker threads (0 to drain manually with run_pending)
+            max_queue_size: Queued jobs accepted before submit raises QueueFullError
+            max_retained_jobs: Finished jobs kept for status lookups
+        """
+        self.handler = handler
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_seconds = max(0.0, float(max_wait_seconds))
+        self.max_queue_size = max(1, int(max_queue_size))
+        self.max_retained_jobs = max(1, int(max_retained_jobs))
+
+        self._queue = deque()
+        self._jobs = {}
+        self._finished = OrderedDict()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._running = 0
+        self._counts = {'completed': 0, 'failed': 0, 'rejected': 0, 'batches': 0, 'batched_jobs': 0}
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            for i in range(max(0, int(num_workers)))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, payload, callback=None):
+        """
+        Queue a payload for processing.
+
+        Args:
+            payload: Object passed to handler as part of a batch
+            callback: Optional callable invoked with the Job once it finishes
+
+        Returns:
+            The queued Job
+        """
+        job = Job(payload, callback)
+        with self._condition:
+            if self._closed:
+                raise QueueClosedError("Job queue is shut down")
+            if len(self._queue) >= self.max_queue_size:
+                self._counts['rejected'] += 1
+                raise QueueFullError(f"Job queue is full ({self.max_queue_size} jobs waiting)")
+            self._queue.append(job)
+            self._jobs[job.id] = job
+            self._condition.notify()
+        return job
+
+    def get(self, job_id):
+        """Return the Job with this id, or None if unknown or expired."""
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        """Queue depth, in-flight and finished counts, and mean batch size."""
+        with self._condition:
+            batches = self._counts['batches']
+            return {
+                'queued': len(self._queue),
+                'running': self._running,
+                'capacity': self.max_queue_size,
+                'workers': len(self._workers),
+                'completed': self._counts['completed'],
+                'failed': self._counts['failed'],
+                'rejected': self._counts['rejected'],
+                'batches': batches,
+                'mean_batch_size': self._counts['batched_jobs'] / batches if batches else 0.0,
+            }
+
+    def run_pending(self):
+        """Process every queued job on the calling thread, in batches."""
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._run_batch(batch)
+
+    def shutdown(self, wait=True, timeout=None):
+        """
+        Stop accepting jobs; workers finish what is queued, then exit.
+
+        Args:
+            wait: Join the worker threads before returning
+            timeout: Per-worker join timeout in seconds
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join(timeout)
+
+    def _take_batch(self):
+        """Pop up to max_batch_size jobs and mark them running (lock held)."""
+        count = min(self.max_batch_size, len(self._queue))
+        batch = [self._queue.popleft() for _ in range(count)]
+        started = time.time()
+        for job in batch:
+            job.status = 'running'
+            job.started_at = started
+            job.batch_size = count
+        self._running += count
+        return batch
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                # Give the batch until the oldest job's deadline to fill up
+                deadline = self._queue[0]._enqueued + self.max_wait_seconds
+                while 0 < len(self._queue) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._take_batch()
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            results = self.handler([job.payload for job in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Handler returned {len(results)} results for {len(batch)} jobs")
+            outcomes = list(results)
+        except Exception as e:
+            outcomes = [e] * len(batch)
+
+        finished = time.time()
+        with self._condition:
+            self._running -= len(batch)
+            self._counts['batches'] += 1
+            self._counts['batched_jobs'] += len(batch)
+            for job, outcome in zip(batch, outcomes):
+                if isinstance(outcome, Exception):
+                    job.status = 'failed'
+                    job.error = str(outcome)
+                else:
+                    job.status = 'completed'
+                    job.result = outcome
+                job.finished_at = finished
+                # Finished jobs are kept only for status polling; drop the
+                # uploaded bytes they were submitted with
+                job.payload = None
+                self._counts[job.status] += 1
+                self._finished[job.id] = job
+            while len(self._finished) > self.max_retained_jobs:
+                expired, _ = self._finished.popitem(last=False)
+                self._jobs.pop(expired, None)
+
+        for job in batch:
+            job._done.set()
+            if job.callback is not None:
+                try:
+                    job.callback(job)
+                except Exception as e:
+                    print(f"⚠️ Job callback error: {e}")
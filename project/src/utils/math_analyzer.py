@@ -1,11 +1,115 @@
+import time
+from functools import lru_cache
+
+import numpy as np
 import sympy as sp
 from sympy import symbols, diff, integrate, simplify
 
+from .process_pool import OperationTimeout, PoolBusyError
+
+
+# Steps of symbolic_analysis, in the order they are computed
+SYMBOLIC_OPERATIONS = ('original', 'derivative', 'integral', 'simplified')
+
+
+def symbolic_operation(operation, expression_str, parse=sp.sympify):
+    """
+    Compute one step of symbolic_analysis.
+    
+    Module-level so it can run in an IsolatedProcessPool worker.
+    
+    Args:
+        operation: One of SYMBOLIC_OPERATIONS
+        expression_str: String representation of mathematical expression
+        parse: Function turning the string into a SymPy expression
+        
+    Returns:
+        The step's result as a string
+    """
+    x = symbols('x')
+    expr = parse(expression_str)
+    if operation == 'original':
+        return str(expr)
+    if operation == 'derivative':
+        return str(simplify(diff(expr, x)))
+    if operation == 'integral':
+        return str(simplify(integrate(expr, x)))
+    if operation == 'simplified':
+        return str(simplify(expr))
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def solve_operation(equation_str, parse=sp.sympify):
+    """Solve an equation for x; module-level so it can run in a pool worker."""
+    x = symbols('x')
+    expr = parse(equation_str)
+    solutions = sp.solve(expr, x)
+    return [str(sol) for sol in solutions]
+
 
 class MathAnalyzer:
-    def __init__(self):
-        """Initialize mathematical analyzer."""
-        pass
+    def __init__(self, cache_size=256, pool=None, timeout=10.0):
+        """
+        Initialize mathematical analyzer.
+        
+        Args:
+            cache_size: Expressions kept in each LRU cache (parsed
+                expressions, symbolic results and compiled functions)
+            pool: Optional IsolatedProcessPool; when given, integrate,
+                simplify and solve run in its workers and are cancelled
+                after timeout seconds
+            timeout: Time limit in seconds for all symbolic steps of one
+                expression, and for one solve, when a pool is used
+        """
+        self.pool = pool
+        self.timeout = timeout
+        
+        # Per-instance caches keyed by the expression string; SymPy
+        # expressions are immutable, so cached objects are safe to share.
+        self._parse = lru_cache(maxsize=cache_size)(sp.sympify)
+        self._analyze = lru_cache(maxsize=cache_size)(self._symbolic_results)
+        self._compile = lru_cache(maxsize=cache_size)(self._lambdify)
+    
+    def cache_info(self):
+        """Hit/miss counters of the expression caches."""
+        return {
+            name: cache.cache_info()._asdict()
+            for name, cache in (('parse', self._parse), ('symbolic', self._analyze),
+                                ('compiled', self._compile))
+        }
+    
+    def _symbolic_results(self, expression_str):
+        """
+        Derivative, integral and simplified form of one expression (uncached).
+        
+        With a pool, all steps share one deadline of self.timeout seconds;
+        steps still unfinished when it passes are listed under 'timed_out'.
+        Such partial results are cached like complete ones, so resubmitting
+        the expression does not spend the time again.
+        """
+        if self.pool is None:
+            return {
+                operation: symbolic_operation(operation, expression_str, self._parse)
+                for operation in SYMBOLIC_OPERATIONS
+            }
+        
+        results = {}
+        timed_out = []
+        deadline = time.monotonic() + self.timeout
+        for operation in SYMBOLIC_OPERATIONS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out.append(operation)
+                continue
+            try:
+                results[operation] = self.pool.run(
+                    symbolic_operation, operation, expression_str, timeout=remaining
+                )
+            except OperationTimeout:
+                timed_out.append(operation)
+        if timed_out:
+            results['timed_out'] = timed_out
+        return results
     
     def symbolic_analysis(self, expression_str):
         """
@@ -15,26 +119,27 @@ class MathAnalyzer:
             expression_str: String representation of mathematical expression
             
         Returns:
-            Dictionary with original, derivative, and integral
+            Dictionary with original, derivative, and integral. With a
+            pool, steps that do not finish within the timeout are omitted
+            and listed under 'timed_out'; the finished steps are still
+            returned.
+            
+        Raises:
+            PoolBusyError: Every worker is busy and the wait queue is full
         """
         try:
-            x = symbols('x')
-            expr = sp.sympify(expression_str)
-            
-            derivative = diff(expr, x)
-            integral = integrate(expr, x)
-            
-            return {
-                'original': str(expr),
-                'derivative': str(simplify(derivative)),
-                'integral': str(simplify(integral)),
-                'simplified': str(simplify(expr))
-            }
+            result = dict(self._analyze(expression_str))
+        except PoolBusyError:
+            raise
         except Exception as e:
             return {
                 'error': str(e),
                 'original': expression_str
             }
+        if 'original' not in result:
+            result['error'] = f"Expression timed out after {self.timeout}s"
+            result['original'] = expression_str
+        return result
     
     def evaluate_expression(self, expression_str, variable_values):
         """
@@ -48,7 +153,7 @@ class MathAnalyzer:
             Numeric result
         """
         try:
-            expr = sp.sympify(expression_str)
+            expr = self._parse(expression_str)
             result = expr.subs(variable_values)
             return float(result.evalf())
         except Exception as e:
@@ -63,12 +168,53 @@ class MathAnalyzer:
             
         Returns:
             List of solutions
+            
+        Raises:
+            PoolBusyError: Every worker is busy and the wait queue is full
         """
         try:
-            x = symbols('x')
-            expr = sp.sympify(equation_str)
-            solutions = sp.solve(expr, x)
-            return [str(sol) for sol in solutions]
+            if self.pool is not None:
+                return self.pool.run(solve_operation, equation_str, timeout=self.timeout)
+            return solve_operation(equation_str, self._parse)
+        except OperationTimeout:
+            return {'error': f"Solving timed out after {self.timeout}s"}
+        except PoolBusyError:
+            raise
+        except Exception as e:
+            return {'error': str(e)}
+    
+    def _lambdify(self, expression_str, variable_names):
+        """Compile an expression to a NumPy function of the named variables (uncached)."""
+        expr = self._parse(expression_str)
+        variables = symbols(variable_names) if variable_names else ()
+        missing = expr.free_symbols - set(variables)
+        if missing:
+            raise ValueError(f"No values given for: {', '.join(sorted(map(str, missing)))}")
+        return sp.lambdify(variables, expr, modules='numpy')
+    
+    def evaluate_batch(self, expression_str, variable_values):
+        """
+        Evaluate an expression over arrays of variable values.
+        
+        The expression is compiled to a NumPy function once (and cached),
+        then evaluated as vectorized array math, so a parameter sweep costs
+        one call instead of one SymPy substitution per point.
+        
+        Args:
+            expression_str: String representation of expression
+            variable_values: Dictionary of variable names to scalars or
+                arrays; arrays are broadcast against each other
+            
+        Returns:
+            numpy array of results with the broadcast shape of the inputs
+        """
+        try:
+            names = tuple(sorted(variable_values))
+            function = self._compile(expression_str, names)
+            arrays = [np.asarray(variable_values[name]) for name in names]
+            shape = np.broadcast_shapes(*(a.shape for a in arrays)) if arrays else ()
+            result = np.asarray(function(*arrays))
+            # Constant terms come back as scalars; give them the sweep's shape
+            return np.broadcast_to(result, shape).copy() if result.shape != shape else result
         except Exception as e:
             return {'error': str(e)}
-
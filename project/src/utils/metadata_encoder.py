@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# pd.util.hash_array's default key; any fixed 16-character key gives codes
+# that are identical in every process, unlike Python's salted hash()
+DEFAULT_HASH_KEY = '0123456789123456'
+DEFAULT_NUM_BUCKETS = 1 << 20
+ENCODINGS = ('hash', 'vocabulary')
+# pd.api.types.infer_dtype results of object columns holding only numbers
+NUMERIC_INFERRED_TYPES = ('integer', 'floating', 'mixed-integer-float', 'decimal', 'boolean')
+
+
+class MetadataEncoder:
+    """
+    Turn a metadata DataFrame into a numeric matrix, one column per field.
+
+    Each column's type is decided from all of its values: a column is
+    numeric if every non-missing value is a number (or boolean), and
+    categorical otherwise, including strings of digits such as "42". The
+    first decision for a column name is kept, so its encoding stays the
+    same from one request to the next; a column with no values yet is
+    left undecided (and encoded as 0) until one arrives.
+    Numeric columns pass through. Categorical values are encoded either
+
+        hash        with a keyed SipHash (pd.util.hash_array) into codes
+                    1..num_buckets; stateless and identical in every
+                    worker process
+        vocabulary  with codes 1..n from a vocabulary built by fit() and
+                    persisted with save(); unseen values get 0
+
+    Missing values are encoded as 0 in every case.
+
+    Both run over whole columns, hashing or looking up each distinct value
+    once, without a Python loop over rows.
+    """
+
+    def __init__(self, encoding='hash', num_buckets=DEFAULT_NUM_BUCKETS, hash_key=DEFAULT_HASH_KEY,
+                 vocabulary=None):
+        """
+        Initialize encoder.
+
+        Args:
+            encoding: 'hash' or 'vocabulary'
+            num_buckets: Number of hash codes per categorical column
+            hash_key: 16-character key of the hash; changing it changes every code
+            vocabulary: Optional {column: list of values} for 'vocabulary'
+                encoding, as produced by fit() or to_dict()
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}, got {encoding!r}")
+        if len(hash_key.encode('utf8')) != 16:
+            raise ValueError("hash_key must be 16 bytes long")
+        self.encoding = encoding
+        self.num_buckets = int(num_buckets)
+        self.hash_key = hash_key
+        self.column_kinds = {}
+        self._vocabulary = {column: pd.Index([str(v) for v in values], dtype=object)
+                            for column, values in (vocabulary or {}).items()}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _as_frame(metadata):
+        if isinstance(metadata, pd.DataFrame):
+            return metadata
+        return pd.DataFrame([metadata])
+
+    @staticmethod
+    def _infer_kind(values):
+        """
+        'numeric' if every non-missing value is a number, else 'categorical';
+        None when every value is missing.
+
+        Strings are categorical even when they look like numbers ("42").
+        """
+        if not values.notna().any():
+            return None
+        if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+            return 'numeric'
+        kind = pd.api.types.infer_dtype(values, skipna=True)
+        return 'numeric' if kind in NUMERIC_INFERRED_TYPES else 'categorical'
+
+    def _kind(self, column, values):
+        kind = self.column_kinds.get(column)
+        if kind is None:
+            kind = self._infer_kind(values)
+            if kind is not None:
+                kind = self.column_kinds.setdefault(column, kind)
+        return kind
+
+    @staticmethod
+    def _as_strings(values):
+        """Categorical values as an object array of strings; missing values become ''."""
+        return values.astype(object).where(values.notna(), '').astype(str).to_numpy(dtype=object)
+
+    def _hash_codes(self, values):
+        hashed = pd.util.hash_array(self._as_strings(values), hash_key=self.hash_key)
+        codes = hashed % np.uint64(self.num_buckets) + np.uint64(1)
+        codes[values.isna().to_numpy()] = 0
+        return codes
+
+    def _vocabulary_codes(self, column, values):
+        vocabulary = self._vocabulary.get(column)
+        if vocabulary is None:
+            return np.zeros(len(values), dtype=np.int64)
+        codes = vocabulary.get_indexer(self._as_strings(values)) + 1
+        codes[values.isna().to_numpy()] = 0
+        return codes
+
+    def fit(self, metadata):
+        """
+        Add the categorical values of a frame to the vocabulary.
+
+        New values get the next free codes, so codes already handed out
+        never change.
+
+        Returns:
+            self
+        """
+        metadata = self._as_frame(metadata)
+        with self._lock:
+            for column, values in metadata.items():
+                column = str(column)
+                if self._kind(column, values) != 'categorical':
+                    continue
+                values = pd.Index(pd.unique(self._as_strings(values.dropna())))
+                known = self._vocabulary.get(column)
+                if known is None:
+                    self._vocabulary[column] = values
+                else:
+                    self._vocabulary[column] = known.append(values.difference(known, sort=False))
+        return self
+
+    def transform(self, metadata):
+        """
+        Encode metadata.
+
+        Args:
+            metadata: DataFrame, or a dict of one row's fields
+
+        Returns:
+            Tuple of (float64 array of shape (rows, columns), column names
+            'meta_<field>')
+        """
+        metadata = self._as_frame(metadata)
+        values = np.empty((len(metadata), metadata.shape[1]), dtype=np.float64)
+        columns = []
+        for i, (column, series) in enumerate(metadata.items()):
+            column = str(column)
+            columns.append(f'meta_{column}')
+            kind = self._kind(column, series)
+            if kind is None:
+                values[:, i] = 0.0
+            elif kind == 'numeric':
+                values[:, i] = pd.to_numeric(series, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+            elif self.encoding == 'hash':
+                values[:, i] = self._hash_codes(series)
+            else:
+                values[:, i] = self._vocabulary_codes(column, series)
+        return values, columns
+
+    def to_dict(self):
+        """Serialize settings, column types and vocabulary to a JSON-compatible dictionary."""
+        return {
+            'encoding': self.encoding,
+            'num_buckets': self.num_buckets,
+            'hash_key': self.hash_key,
+            'column_kinds': dict(self.column_kinds),
+            'vocabulary': {column: index.tolist() for column, index in self._vocabulary.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild an encoder produced by to_dict."""
+        encoder = cls(encoding=state['encoding'], num_buckets=state['num_buckets'],
+                      hash_key=state['hash_key'], vocabulary=state.get('vocabulary'))
+        encoder.column_kinds.update(state.get('column_kinds', {}))
+        return encoder
+
+    def save(self, path):
+        """Atomically write the encoder to a JSON file."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read an encoder written by save."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
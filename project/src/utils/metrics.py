@@ -0,0 +1,213 @@
+import bisect
+import math
+import threading
+import time
+
+
+# Upper bounds (seconds) of the latency histogram buckets, from 1 ms to 30 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observed values.
+
+    observe() is a bisect and three increments under a lock, so it is
+    cheap enough to wrap every stage of every request.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """Return (cumulative bucket counts including +Inf, sum, count)."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class StageTimer:
+    """Context manager that records its wall time into a histogram."""
+
+    __slots__ = ('histogram', 'start', 'elapsed')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = None
+        self.elapsed = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.elapsed)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Process-wide histograms, counters and collected gauges, rendered in
+    the Prometheus text exposition format.
+
+    Histograms and counters are created on first use and keyed by name
+    and labels. Gauges are pulled from collectors when the registry is
+    rendered, so existing stats() methods can be exported unchanged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._collectors = []
+
+    def histogram(self, name, labels=None, help_text=None, buckets=DEFAULT_BUCKETS):
+        """The histogram for name and labels, created on first use."""
+        key = (name, tuple(sorted((labels or {}).items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+                if help_text:
+                    self._help.setdefault(name, help_text)
+        return histogram
+
+    def inc(self, name, amount=1, labels=None, help_text=None):
+        """Add to a counter."""
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def stage(self, name):
+        """
+        Time a block of work as one pipeline stage.
+
+        Usage:
+            with registry.stage('image_forward'):
+                features = model(batch)
+        """
+        return StageTimer(self.histogram(
+            'stage_duration_seconds', {'stage': name},
+            'Wall time spent in each processing stage'
+        ))
+
+    def register_collector(self, prefix, collect, labels=None):
+        """
+        Export the numeric values of a stats dictionary as gauges.
+
+        Args:
+            prefix: Metric name prefix, e.g. 'feature_cache'
+            collect: Callable returning a (possibly nested) dict of stats;
+                nested keys are joined with '_', non-numeric values skipped
+            labels: Optional labels attached to every exported gauge
+        """
+        with self._lock:
+            self._collectors.append((prefix, collect, dict(labels or {})))
+
+    def _collect_gauges(self):
+        gauges = {}
+        with self._lock:
+            collectors = list(self._collectors)
+        for prefix, collect, labels in collectors:
+            try:
+                stats = collect()
+            except Exception as e:
+                print(f"⚠️ Metrics collector {prefix} failed: {e}")
+                continue
+            pending = [(prefix, stats)]
+            while pending:
+                name, value = pending.pop()
+                if isinstance(value, dict):
+                    pending.extend((f"{name}_{key}", item) for key, item in value.items())
+                elif isinstance(value, (int, float)):
+                    gauges.setdefault(name, []).append((labels, value))
+        return gauges
+
+    def render(self):
+        """All metrics in Prometheus text format (version 0.0.4)."""
+        lines = []
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        previous = None
+        for (name, labels), histogram in histograms:
+            if name != previous:
+                header(name, 'histogram')
+                previous = name
+            labels = dict(labels)
+            cumulative, total, count = histogram.snapshot()
+            for bound, value in zip(histogram.buckets + (math.inf,), cumulative):
+                bucket_labels = dict(labels, le=_format_value(bound))
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {value}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        previous = None
+        for (name, labels), value in counters:
+            if name != previous:
+                header(name, 'counter')
+                previous = name
+            lines.append(f"{name}{_format_labels(dict(labels))} {_format_value(value)}")
+
+        for name, samples in sorted(self._collect_gauges().items()):
+            header(name, 'gauge')
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+# Default registry used by the processors and the web app
+REGISTRY = MetricsRegistry()
+
+
+def stage(name):
+    """Time a block as a stage in the default registry."""
+    return REGISTRY.stage(name)
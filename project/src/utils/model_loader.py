@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+
+import torch
+
+
+MODEL_STATES = ('unloaded', 'loading', 'ready', 'unavailable', 'failed')
+
+
+class LazyModel:
+    """
+    Thread-safe handle that builds a model on first use.
+
+    The factory runs at most once: either on the first get() or on a
+    background thread started by warm_up(). Callers arriving while a load
+    is in progress block until it finishes. A factory that returns None
+    marks the model 'unavailable' (callers fall back); one that raises
+    marks it 'failed' and get() re-raises the error.
+    """
+
+    def __init__(self, name, factory):
+        """
+        Initialize an unloaded handle.
+
+        Args:
+            name: Label used in status reports and thread names
+            factory: Zero-argument callable returning the ready model
+        """
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._model = None
+        self._state = 'unloaded'
+        self._error = None
+        self._load_seconds = None
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def loaded(self):
+        """True once the factory has run, whatever its outcome."""
+        return self._state in ('ready', 'unavailable', 'failed')
+
+    def get(self):
+        """Return the model, loading it on this thread if nobody has yet."""
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self._load()
+        if self._state == 'failed':
+            raise RuntimeError(f"{self.name} model failed to load: {self._error}")
+        return self._model
+
+    def _load(self):
+        self._state = 'loading'
+        start = time.perf_counter()
+        try:
+            model = self._factory()
+        except Exception as e:
+            self._error = str(e)
+            self._state = 'failed'
+        else:
+            self._model = model
+            self._state = 'ready' if model is not None else 'unavailable'
+        self._load_seconds = time.perf_counter() - start
+
+    def warm_up(self):
+        """
+        Load the model on a daemon thread.
+
+        Returns:
+            The started thread (already-loaded handles return None)
+        """
+        if self.loaded:
+            return None
+
+        def load():
+            try:
+                self.get()
+            except RuntimeError as e:
+                print(f"⚠️ {e}")
+
+        thread = threading.Thread(target=load, name=f"warm-up-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        """State, load time and error message for health reporting."""
+        return {
+            'state': self._state,
+            'load_seconds': self._load_seconds,
+            'error': self._error,
+        }
+
+
+def load_with_weight_cache(build_skeleton, build_pretrained, cache_path):
+    """
+    Build a pretrained model, reusing a local copy of its weights.
+
+    The first call builds the model the slow way (download, checkpoint
+    decode, random init that is then overwritten) and saves its
+    state_dict to cache_path. Later calls construct the architecture on
+    the meta device, which allocates and initializes nothing, and attach
+    the cached tensors straight from a memory map, so startup costs
+    little more than building the module tree. Weights are paged in as
+    they are first touched.
+
+    Args:
+        build_skeleton: Callable returning the architecture with any weights
+        build_pretrained: Callable returning the model with pretrained weights
+        cache_path: Where the state_dict is cached (a torch.save file)
+
+    Returns:
+        Model in eval mode on the CPU
+    """
+    if os.path.exists(cache_path):
+        try:
+            with torch.device('meta'):
+                model = build_skeleton()
+            state_dict = torch.load(cache_path, mmap=True, weights_only=True, map_location='cpu')
+            model.load_state_dict(state_dict, assign=True)
+            leftover = [name for name, tensor in
+                        list(model.named_parameters()) + list(model.named_buffers())
+                        if tensor.is_meta]
+            if leftover:
+                raise RuntimeError(f"cached weights do not cover {leftover[:3]}")
+            return model.eval()
+        except Exception as e:
+            # Older torch without meta/mmap loading, or a stale cache file
+            print(f"⚠️ Could not load cached weights from {cache_path}: {e}")
+
+    model = build_pretrained()
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    torch.save(model.state_dict(), tmp_path)
+    os.replace(tmp_path, cache_path)
+    return model.eval()
@@ -0,0 +1,208 @@
+import multiprocessing
+import queue
+import sys
+import threading
+import traceback
+import types
+
+
+# Serializes worker starts that temporarily hide the __main__ module
+_start_lock = threading.Lock()
+
+
+class OperationTimeout(TimeoutError):
+    """Raised when an operation exceeds its timeout; its worker is replaced."""
+
+
+class PoolBusyError(RuntimeError):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class RemoteError(RuntimeError):
+    """An exception raised inside a worker, carrying the worker traceback."""
+
+    def __init__(self, message, remote_traceback=None):
+        super().__init__(message)
+        self.remote_traceback = remote_traceback
+
+
+def _worker_main(conn):
+    """Worker loop: run (func, args) requests until the pipe closes."""
+    while True:
+        try:
+            func, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send(('ok', func(*args, **kwargs)))
+        except Exception as e:
+            conn.send(('error', (str(e) or type(e).__name__, traceback.format_exc())))
+
+
+def _start_without_main(process):
+    """
+    Start a spawn or forkserver process without re-running __main__ in it.
+
+    Those start methods re-import the parent's main script in every child
+    so that functions defined there can be unpickled. Workers only run
+    module-level functions of importable modules, and re-running a script
+    such as config/app.py would build a second server in each worker, so
+    the child is prepared as if __main__ were empty.
+    """
+    with _start_lock:
+        main = sys.modules['__main__']
+        sys.modules['__main__'] = types.ModuleType('__main__')
+        try:
+            process.start()
+        finally:
+            sys.modules['__main__'] = main
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        if context.get_start_method() == 'fork':
+            self.process.start()
+        else:
+            _start_without_main(self.process)
+        child_conn.close()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class IsolatedProcessPool:
+    """
+    Pool of worker processes whose operations can be timed out and killed.
+
+    Unlike concurrent.futures.ProcessPoolExecutor, a running operation
+    that exceeds its timeout is cancelled by terminating its worker, which
+    is replaced by a fresh process, so one runaway call cannot keep a
+    worker (or the caller) busy indefinitely. Callers wait for a free
+    worker in a bounded queue: once max_pending callers are already
+    waiting, run raises PoolBusyError instead of piling up more work.
+
+    Functions and arguments must be picklable (module-level functions).
+    Workers use the 'forkserver' start method where available: they are
+    forked from a single-threaded server process, never from the caller.
+    Forking a multithreaded server (request threads, job-queue workers,
+    torch thread pools) can copy a lock held by another thread into the
+    child, which then deadlocks; that also applies to workers respawned
+    after a timeout. 'fork' starts faster but is only used when asked for.
+    """
+
+    def __init__(self, num_workers=2, max_pending=8, queue_timeout=5.0, start_method=None):
+        """
+        Initialize the pool and start its workers.
+
+        Args:
+            num_workers: Worker processes
+            max_pending: Callers allowed to wait for a free worker
+            queue_timeout: Longest a caller waits for a worker before PoolBusyError
+            start_method: multiprocessing start method ('forkserver' where
+                available, else 'spawn'); 'fork' is only safe while the
+                calling process has a single thread
+        """
+        if start_method is None:
+            available = multiprocessing.get_all_start_methods()
+            start_method = 'forkserver' if 'forkserver' in available else 'spawn'
+        self._context = multiprocessing.get_context(start_method)
+        self.num_workers = max(1, int(num_workers))
+        self.max_pending = max(0, int(max_pending))
+        self.queue_timeout = queue_timeout
+
+        self._slots = threading.BoundedSemaphore(self.num_workers + self.max_pending)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._counters = {'completed': 0, 'failed': 0, 'timed_out': 0, 'rejected': 0, 'respawned': 0}
+        for _ in range(self.num_workers):
+            self._idle.put(_Worker(self._context))
+
+    def run(self, func, *args, timeout=None, **kwargs):
+        """
+        Run func(*args, **kwargs) in a worker process.
+
+        Args:
+            func: Picklable callable
+            timeout: Seconds before the operation is cancelled (None waits forever)
+
+        Returns:
+            func's return value
+
+        Raises:
+            OperationTimeout: The operation was cancelled
+            PoolBusyError: No worker became free in time
+            RemoteError: func raised inside the worker
+        """
+        if self._closed:
+            raise RuntimeError("Process pool is shut down")
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise PoolBusyError("All workers are busy and the wait queue is full")
+        try:
+            try:
+                worker = self._idle.get(timeout=self.queue_timeout)
+            except queue.Empty:
+                self._count('rejected')
+                raise PoolBusyError("Timed out waiting for a free worker")
+            return self._run_on(worker, func, args, kwargs, timeout)
+        finally:
+            self._slots.release()
+
+    def _run_on(self, worker, func, args, kwargs, timeout):
+        healthy = False
+        try:
+            worker.conn.send((func, args, kwargs))
+            if not worker.conn.poll(timeout):
+                self._count('timed_out')
+                raise OperationTimeout(f"Operation timed out after {timeout}s")
+            status, payload = worker.conn.recv()
+            healthy = True
+        except OperationTimeout:
+            raise
+        except (EOFError, OSError) as e:
+            self._count('failed')
+            raise RemoteError(f"Worker process died: {e}")
+        finally:
+            if healthy and not self._closed:
+                self._idle.put(worker)
+            else:
+                # Cancel whatever the worker is doing by replacing it
+                worker.stop()
+                if not self._closed:
+                    self._count('respawned')
+                    self._idle.put(_Worker(self._context))
+
+        if status == 'error':
+            self._count('failed')
+            message, remote_traceback = payload
+            raise RemoteError(message, remote_traceback)
+        self._count('completed')
+        return payload
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        """Worker count, idle workers and operation counters."""
+        with self._lock:
+            return dict(self._counters, workers=self.num_workers,
+                        idle=self._idle.qsize(), max_pending=self.max_pending)
+
+    def shutdown(self):
+        """Stop every idle worker; busy ones stop when their operation returns."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.stop()
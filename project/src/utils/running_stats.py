@@ -0,0 +1,102 @@
+import numpy as np
+
+
+class RunningMoments:
+    """
+    Streaming count, mean, variance, min and max.
+
+    Each update folds a whole batch in with Chan et al.'s pairwise form of
+    Welford's algorithm, so statistics can be accumulated chunk by chunk in
+    one pass and partial results from separate shards can be merged
+    exactly. With shape=() every value in a batch is pooled into scalar
+    statistics; with shape=(d,) statistics are kept per column of
+    (n, d) batches.
+    """
+
+    def __init__(self, shape=()):
+        """
+        Initialize empty statistics.
+
+        Args:
+            shape: Shape of one observation, () for scalars or (d,) for rows
+        """
+        self.shape = tuple(shape)
+        self.count = 0
+        self.mean = np.zeros(self.shape, dtype=np.float64)
+        self.m2 = np.zeros(self.shape, dtype=np.float64)
+        self.min = np.full(self.shape, np.inf)
+        self.max = np.full(self.shape, -np.inf)
+
+    def update(self, values):
+        """
+        Fold a batch of observations into the statistics.
+
+        Args:
+            values: Array-like; flattened for scalar statistics, otherwise
+                reshaped to (n, *shape)
+
+        Returns:
+            self, for chaining
+        """
+        values = np.asarray(values)
+        values = values.reshape(-1) if not self.shape else values.reshape((-1,) + self.shape)
+        count = values.shape[0]
+        if count == 0:
+            return self
+
+        batch = values.astype(np.float64, copy=False)
+        batch_mean = batch.mean(axis=0)
+        deviations = batch - batch_mean
+        batch_m2 = np.einsum('i...,i...->...', deviations, deviations)
+
+        self._combine(count, batch_mean, batch_m2, batch.min(axis=0), batch.max(axis=0))
+        return self
+
+    def merge(self, other):
+        """Fold another RunningMoments (e.g. from a parallel shard) into this one."""
+        if other.shape != self.shape:
+            raise ValueError(f"Cannot merge statistics of shape {other.shape} into {self.shape}")
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + delta * delta * (self.count * count / total)
+        self.min = np.minimum(self.min, minimum)
+        self.max = np.maximum(self.max, maximum)
+        self.count = total
+
+    def variance(self, ddof=0):
+        """Variance with the given delta degrees of freedom (NaN if undefined)."""
+        if self.count - ddof <= 0:
+            return np.full(self.shape, np.nan)[()]
+        return (self.m2 / (self.count - ddof))[()]
+
+    def std(self, ddof=0):
+        """Standard deviation with the given delta degrees of freedom."""
+        return np.sqrt(self.variance(ddof))
+
+    def to_dict(self):
+        """Serialize to a JSON-compatible dictionary."""
+        return {
+            'shape': list(self.shape),
+            'count': int(self.count),
+            'mean': np.asarray(self.mean).tolist(),
+            'm2': np.asarray(self.m2).tolist(),
+            'min': np.asarray(self.min).tolist(),
+            'max': np.asarray(self.max).tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild statistics produced by to_dict."""
+        moments = cls(tuple(state['shape']))
+        moments.count = int(state['count'])
+        moments.mean = np.asarray(state['mean'], dtype=np.float64).reshape(moments.shape)
+        moments.m2 = np.asarray(state['m2'], dtype=np.float64).reshape(moments.shape)
+        moments.min = np.asarray(state['min'], dtype=np.float64).reshape(moments.shape)
+        moments.max = np.asarray(state['max'], dtype=np.float64).reshape(moments.shape)
+        return moments
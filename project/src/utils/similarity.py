@@ -0,0 +1,40 @@
+import numpy as np
+
+
+def iter_similar_pairs(vectors, threshold, block_size=2048, absolute=False):
+    """
+    Find all pairs of rows whose inner product exceeds a threshold.
+
+    The Gram matrix is computed one (block_size x block_size) tile at a
+    time over the upper triangle only, so peak memory stays at a single
+    tile no matter how many rows there are.
+
+    Args:
+        vectors: 2-D numpy array, one item per row
+        threshold: Pairs with similarity strictly above this are returned
+        block_size: Tile edge length in rows
+        absolute: Compare |similarity| instead of the signed value
+
+    Yields:
+        (rows, cols, values) arrays for one tile, with rows < cols
+    """
+    n = vectors.shape[0]
+    block_size = max(1, int(block_size))
+
+    for r0 in range(0, n, block_size):
+        r1 = min(r0 + block_size, n)
+        row_block = vectors[r0:r1]
+        for c0 in range(r0, n, block_size):
+            c1 = min(c0 + block_size, n)
+            tile = row_block @ vectors[c0:c1].T
+            if absolute:
+                np.abs(tile, out=tile)
+
+            mask = tile > threshold
+            if c0 == r0:
+                # Diagonal tile: keep strictly upper-triangular pairs
+                mask = np.triu(mask, k=1)
+
+            rows, cols = np.nonzero(mask)
+            if rows.size:
+                yield rows + r0, cols + c0, tile[rows, cols]
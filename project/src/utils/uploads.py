@@ -0,0 +1,127 @@
+import io
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.utils import secure_filename
+
+
+def as_stream(source):
+    """
+    Return something decoders can open: bytes-like input becomes a fresh
+    BytesIO, paths and file-like objects pass through unchanged.
+
+    Wrapping per call means the same bytes can be decoded any number of
+    times without anyone having to rewind a shared stream.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+class UploadStore:
+    """
+    Optional, asynchronous persistence of uploaded files.
+
+    save() hands the write to a single background thread and returns at
+    once, so requests never wait on the disk. After writes (and at most
+    once per cleanup_interval seconds) the directory is pruned: files
+    older than max_age_seconds go first, then the oldest files until the
+    total is under max_total_bytes.
+    """
+
+    def __init__(self, directory, max_age_seconds=24 * 3600,
+                 max_total_bytes=1024 * 1024 * 1024, cleanup_interval=60.0):
+        """
+        Initialize the store and prune what earlier runs left behind.
+
+        Args:
+            directory: Upload directory (created if missing)
+            max_age_seconds: Remove files older than this (None keeps all ages)
+            max_total_bytes: Keep the directory under this size (None for no cap)
+            cleanup_interval: Minimum seconds between automatic cleanups
+        """
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+        self.max_total_bytes = max_total_bytes
+        self.cleanup_interval = cleanup_interval
+
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-store')
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self._executor.submit(self.cleanup)
+
+    def save(self, data, filename):
+        """
+        Queue bytes for writing under a unique, sanitized name.
+
+        Args:
+            data: File contents
+            filename: Client-supplied name (sanitized)
+
+        Returns:
+            Future resolving to the written path
+        """
+        name = f"{uuid.uuid4().hex[:8]}_{secure_filename(filename) or 'upload'}"
+        path = os.path.join(self.directory, name)
+        return self._executor.submit(self._write, path, bytes(data))
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        if time.monotonic() - self._last_cleanup >= self.cleanup_interval:
+            self.cleanup()
+        return path
+
+    def cleanup(self):
+        """
+        Apply the age and size limits to the upload directory.
+
+        Returns:
+            Number of files removed
+        """
+        with self._lock:
+            self._last_cleanup = time.monotonic()
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort()
+
+            now = time.time()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for mtime, size, path in entries:
+                expired = self.max_age_seconds is not None and now - mtime > self.max_age_seconds
+                oversized = self.max_total_bytes is not None and total > self.max_total_bytes
+                if not (expired or oversized):
+                    # Entries are oldest first, so nothing later qualifies either
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            return removed
+
+    def stats(self):
+        """File count and total bytes currently in the directory."""
+        files = 0
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file(follow_symlinks=False):
+                files += 1
+                total += entry.stat().st_size
+        return {'files': files, 'bytes': total}
+
+    def close(self, wait=True):
+        """Finish (or abandon) pending writes and stop the writer thread."""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import the src package from the project directory, as config/app.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from src.utils.incremental_scaler import IncrementalScaler
+
+
+@pytest.fixture
+def shards():
+    rng = np.random.default_rng(0)
+    return rng.normal(3.0, 2.0, (200, 4)), rng.normal(-1.0, 0.5, (120, 4))
+
+
+def test_partial_fit_matches_standard_scaler(shards):
+    first, second = shards
+    scaler = IncrementalScaler().partial_fit(first).partial_fit(second)
+    reference = StandardScaler().fit(np.vstack(shards))
+
+    assert scaler.n_samples_seen_ == 320
+    np.testing.assert_allclose(scaler.mean_, reference.mean_)
+    np.testing.assert_allclose(scaler.var_, reference.var_)
+    np.testing.assert_allclose(scaler.transform(second), reference.transform(second))
+
+
+def test_constant_features_are_left_unscaled():
+    X = np.column_stack([np.arange(10.0), np.full(10, 7.0)])
+    scaled = IncrementalScaler().fit_transform(X)
+
+    np.testing.assert_allclose(scaled[:, 1], 0.0)
+
+
+def test_width_mismatch_raises(shards):
+    scaler = IncrementalScaler().partial_fit(shards[0])
+
+    with pytest.raises(ValueError):
+        scaler.partial_fit(np.zeros((1, 5)))
+    with pytest.raises(ValueError):
+        scaler.transform(np.zeros((1, 5)))
+
+
+def test_merge_equals_fitting_both_shards(shards):
+    first, second = shards
+    merged = IncrementalScaler().partial_fit(first).merge(IncrementalScaler().partial_fit(second))
+    reference = IncrementalScaler().partial_fit(np.vstack(shards))
+
+    assert merged.n_samples_seen_ == reference.n_samples_seen_
+    np.testing.assert_allclose(merged.mean_, reference.mean_)
+    np.testing.assert_allclose(merged.var_, reference.var_)
+
+
+def test_save_and_load_round_trip(tmp_path, shards):
+    scaler = IncrementalScaler().partial_fit(shards[0])
+    path = str(tmp_path / 'scaler.json')
+    scaler.save(path)
+    restored = IncrementalScaler.load(path)
+
+    assert restored.n_samples_seen_ == scaler.n_samples_seen_
+    np.testing.assert_allclose(restored.transform(shards[1]), scaler.transform(shards[1]))
+
+
+def test_sync_pools_rows_of_every_process(tmp_path, shards):
+    first, second = shards
+    path = str(tmp_path / 'shared.json')
+    a = IncrementalScaler().partial_fit(first)
+    b = IncrementalScaler().partial_fit(second)
+
+    a.sync(path)
+    b.sync(path)
+    # Syncing again without new rows adds nothing
+    a.sync(path)
+
+    assert a.n_samples_seen_ == b.n_samples_seen_ == 320
+    np.testing.assert_allclose(a.mean_, np.vstack(shards).mean(axis=0))
+
+
+def test_merged_rows_are_not_synced_twice(tmp_path, shards):
+    first, second = shards
+    path = str(tmp_path / 'shared.json')
+    a = IncrementalScaler().partial_fit(first)
+    b = IncrementalScaler().partial_fit(second)
+    a.merge(b)
+
+    a.sync(path)
+    b.sync(path)
+
+    assert IncrementalScaler.load(path).n_samples_seen_ == 320
+    np.testing.assert_allclose(b.mean_, np.vstack(shards).mean(axis=0))
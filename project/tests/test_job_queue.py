@@ -0,0 +1,163 @@
+import threading
+
+import pytest
+
+from src.utils.job_queue import BatchingJobQueue, QueueClosedError, QueueFullError
+
+
+class RecordingHandler:
+    """Handler that doubles payloads and records the size of each batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, payloads):
+        self.batches.append(len(payloads))
+        return [payload * 2 for payload in payloads]
+
+
+def test_run_pending_processes_jobs_in_batches():
+    handler = RecordingHandler()
+    jobs_queue = BatchingJobQueue(handler, max_batch_size=3, num_workers=0)
+    jobs = [jobs_queue.submit(i) for i in range(7)]
+
+    jobs_queue.run_pending()
+
+    assert handler.batches == [3, 3, 1]
+    assert [job.result for job in jobs] == [i * 2 for i in range(7)]
+    assert all(job.status == 'completed' and job.done for job in jobs)
+    assert [job.batch_size for job in jobs] == [3, 3, 3, 3, 3, 3, 1]
+    stats = jobs_queue.stats()
+    assert stats['completed'] == 7
+    assert stats['batches'] == 3
+    assert stats['mean_batch_size'] == pytest.approx(7 / 3)
+
+
+def test_submit_raises_queue_full_at_capacity():
+    jobs_queue = BatchingJobQueue(RecordingHandler(), num_workers=0, max_queue_size=2)
+    jobs_queue.submit(1)
+    jobs_queue.submit(2)
+
+    with pytest.raises(QueueFullError):
+        jobs_queue.submit(3)
+    assert jobs_queue.stats()['rejected'] == 1
+
+    # Draining the queue frees capacity again
+    jobs_queue.run_pending()
+    assert jobs_queue.submit(3).status == 'queued'
+
+
+def test_submit_after_shutdown_raises():
+    jobs_queue = BatchingJobQueue(RecordingHandler(), num_workers=0)
+    jobs_queue.shutdown()
+
+    with pytest.raises(QueueClosedError):
+        jobs_queue.submit(1)
+
+
+def test_exception_result_fails_only_its_job():
+    def handler(payloads):
+        return [ValueError(f"bad {p}") if p < 0 else p for p in payloads]
+
+    jobs_queue = BatchingJobQueue(handler, num_workers=0)
+    good, bad = jobs_queue.submit(1), jobs_queue.submit(-1)
+    jobs_queue.run_pending()
+
+    assert good.status == 'completed' and good.result == 1
+    assert bad.status == 'failed' and bad.error == 'bad -1'
+    assert bad.to_dict()['error'] == 'bad -1'
+    assert 'result' not in bad.to_dict()
+
+
+def test_handler_error_fails_whole_batch():
+    def handler(payloads):
+        raise RuntimeError("model crashed")
+
+    jobs_queue = BatchingJobQueue(handler, num_workers=0)
+    jobs = [jobs_queue.submit(i) for i in range(3)]
+    jobs_queue.run_pending()
+
+    assert [job.status for job in jobs] == ['failed'] * 3
+    assert all(job.error == 'model crashed' for job in jobs)
+    assert jobs_queue.stats()['failed'] == 3
+
+
+def test_wrong_result_count_fails_batch():
+    jobs_queue = BatchingJobQueue(lambda payloads: [], num_workers=0)
+    job = jobs_queue.submit(1)
+    jobs_queue.run_pending()
+
+    assert job.status == 'failed'
+    assert 'returned 0 results for 1 jobs' in job.error
+
+
+def test_finished_jobs_are_retained_up_to_limit():
+    jobs_queue = BatchingJobQueue(RecordingHandler(), num_workers=0, max_retained_jobs=2)
+    jobs = [jobs_queue.submit(i) for i in range(3)]
+    assert jobs_queue.get(jobs[0].id) is jobs[0]
+
+    jobs_queue.run_pending()
+
+    assert jobs_queue.get(jobs[0].id) is None
+    assert jobs_queue.get(jobs[1].id) is jobs[1]
+    assert jobs_queue.get(jobs[2].id).to_dict()['result'] == 4
+    assert jobs_queue.get('unknown') is None
+
+
+def test_finished_jobs_release_their_payload():
+    jobs_queue = BatchingJobQueue(RecordingHandler(), num_workers=0)
+    job = jobs_queue.submit(b'uploaded bytes')
+    jobs_queue.run_pending()
+
+    assert job.payload is None
+    assert job.result == b'uploaded bytes' * 2
+
+
+def test_callback_receives_finished_job():
+    finished = []
+    jobs_queue = BatchingJobQueue(RecordingHandler(), num_workers=0)
+    job = jobs_queue.submit(5, callback=finished.append)
+    jobs_queue.run_pending()
+
+    assert finished == [job]
+    assert finished[0].status == 'completed'
+
+
+def test_callback_error_does_not_affect_other_jobs():
+    def failing_callback(job):
+        raise RuntimeError("callback failed")
+
+    finished = []
+    jobs_queue = BatchingJobQueue(RecordingHandler(), num_workers=0)
+    first = jobs_queue.submit(1, callback=failing_callback)
+    second = jobs_queue.submit(2, callback=finished.append)
+    jobs_queue.run_pending()
+
+    assert first.status == 'completed'
+    assert finished == [second]
+
+
+def test_worker_threads_batch_jobs_submitted_together():
+    handler = RecordingHandler()
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking_handler(payloads):
+        started.set()
+        release.wait(5)
+        return handler(payloads)
+
+    jobs_queue = BatchingJobQueue(blocking_handler, max_batch_size=4, max_wait_seconds=0.0,
+                                  num_workers=1)
+    try:
+        first = jobs_queue.submit(0)
+        assert started.wait(5)
+        # Queued while the worker is busy, so they are taken as one batch
+        rest = [jobs_queue.submit(i) for i in range(1, 5)]
+        release.set()
+        assert all(job.wait(5) for job in [first] + rest)
+    finally:
+        jobs_queue.shutdown(timeout=5)
+
+    assert handler.batches == [1, 4]
+    assert [job.result for job in rest] == [2, 4, 6, 8]
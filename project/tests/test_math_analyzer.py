@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from src.utils.math_analyzer import MathAnalyzer
+from src.utils.process_pool import OperationTimeout, PoolBusyError
+
+
+class InlinePool:
+    """
+    Stand-in for IsolatedProcessPool that runs operations in-process.
+
+    Operations named in slow never finish: they use up their timeout and
+    raise OperationTimeout, as a cancelled worker would.
+    """
+
+    def __init__(self, slow=(), busy=False):
+        self.slow = set(slow)
+        self.busy = busy
+        self.calls = []
+
+    def run(self, func, *args, timeout=None, **kwargs):
+        if self.busy:
+            raise PoolBusyError("All workers are busy and the wait queue is full")
+        self.calls.append((args[0], timeout))
+        if args[0] in self.slow:
+            time.sleep(timeout)
+            raise OperationTimeout(f"Operation timed out after {timeout}s")
+        return func(*args, **kwargs)
+
+
+def test_symbolic_analysis_without_pool():
+    result = MathAnalyzer().symbolic_analysis('x**2')
+
+    assert result == {'original': 'x**2', 'derivative': '2*x',
+                      'integral': 'x**3/3', 'simplified': 'x**2'}
+
+
+def test_steps_share_one_deadline():
+    pool = InlinePool(slow={'integral'})
+    analyzer = MathAnalyzer(pool=pool, timeout=0.3)
+
+    start = time.monotonic()
+    result = analyzer.symbolic_analysis('x**2')
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 0.6
+    assert result['derivative'] == '2*x'
+    assert result['timed_out'] == ['integral', 'simplified']
+    assert 'integral' not in result and 'error' not in result
+    # Each step only gets what is left of the budget
+    assert all(timeout <= 0.3 for _, timeout in pool.calls)
+    assert [operation for operation, _ in pool.calls] == ['original', 'derivative', 'integral']
+
+
+def test_timed_out_results_are_cached():
+    pool = InlinePool(slow={'original'})
+    analyzer = MathAnalyzer(pool=pool, timeout=0.1)
+
+    first = analyzer.symbolic_analysis('x**2')
+    calls = len(pool.calls)
+    second = analyzer.symbolic_analysis('x**2')
+
+    assert len(pool.calls) == calls
+    assert first == second
+    assert second['error'] == "Expression timed out after 0.1s"
+    assert second['original'] == 'x**2'
+    assert second['timed_out'] == ['original', 'derivative', 'integral', 'simplified']
+
+
+def test_busy_pool_is_raised_and_not_cached():
+    pool = InlinePool(busy=True)
+    analyzer = MathAnalyzer(pool=pool, timeout=1.0)
+
+    with pytest.raises(PoolBusyError):
+        analyzer.symbolic_analysis('x**2')
+
+    pool.busy = False
+    assert analyzer.symbolic_analysis('x**2')['derivative'] == '2*x'
+
+
+def test_parse_errors_are_reported():
+    result = MathAnalyzer().symbolic_analysis('x+')
+
+    assert result['original'] == 'x+'
+    assert 'error' in result
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.metadata_encoder import MetadataEncoder
+
+
+def test_numbers_pass_through_and_strings_are_hashed():
+    encoder = MetadataEncoder(num_buckets=1000)
+    values, columns = encoder.transform(pd.DataFrame({
+        'score': [0.5, 2.0],
+        'count': [1, 3],
+        'flag': [True, False],
+        'source': ['api', 'upload'],
+    }))
+
+    assert columns == ['meta_score', 'meta_count', 'meta_flag', 'meta_source']
+    np.testing.assert_array_equal(values[:, :3], [[0.5, 1, 1], [2.0, 3, 0]])
+    assert all(1 <= code <= 1000 for code in values[:, 3])
+    assert values[0, 3] != values[1, 3]
+
+
+def test_numeric_strings_are_categorical():
+    encoder = MetadataEncoder()
+    values, _ = encoder.transform({'version': '42', 'ratio': '0.8'})
+
+    assert encoder.column_kinds == {'version': 'categorical', 'ratio': 'categorical'}
+    assert values[0, 0] != 42
+    # Later requests keep the column's first type, whatever they send
+    later, _ = encoder.transform({'version': 42, 'ratio': 0.8})
+    assert encoder.column_kinds['version'] == 'categorical'
+    np.testing.assert_array_equal(later, values)
+
+
+def test_type_is_decided_from_the_whole_column():
+    encoder = MetadataEncoder()
+    encoder.transform(pd.DataFrame({'mixed': [1, 'a'], 'numbers': [1, 2.5]}, dtype=object))
+
+    assert encoder.column_kinds == {'mixed': 'categorical', 'numbers': 'numeric'}
+
+
+def test_missing_values_encode_as_zero():
+    encoder = MetadataEncoder()
+    values, _ = encoder.transform(pd.DataFrame({'source': ['api', None], 'score': [np.nan, 1.0]}))
+
+    assert values[1, 0] == 0
+    assert values[0, 1] == 0
+    assert values[0, 0] != 0
+
+
+def test_all_missing_column_stays_undecided():
+    encoder = MetadataEncoder()
+    values, _ = encoder.transform(pd.DataFrame({'source': [None, None]}))
+
+    np.testing.assert_array_equal(values, [[0], [0]])
+    assert 'source' not in encoder.column_kinds
+
+    values, _ = encoder.transform(pd.DataFrame({'source': ['api', 'upload']}))
+    assert encoder.column_kinds['source'] == 'categorical'
+    assert values[0, 0] != values[1, 0]
+
+
+def test_hash_codes_are_stable_across_encoders():
+    first, _ = MetadataEncoder().transform({'source': 'api'})
+    second, _ = MetadataEncoder().transform({'source': 'api'})
+
+    np.testing.assert_array_equal(first, second)
+
+
+def test_vocabulary_encoding_and_round_trip(tmp_path):
+    encoder = MetadataEncoder(encoding='vocabulary')
+    encoder.fit(pd.DataFrame({'source': ['api', 'upload', 'api']}))
+    encoder.fit(pd.DataFrame({'source': ['batch', 'api']}))
+
+    values, _ = encoder.transform(pd.DataFrame({'source': ['api', 'upload', 'batch', 'unseen', None]}))
+    np.testing.assert_array_equal(values[:, 0], [1, 2, 3, 0, 0])
+
+    path = str(tmp_path / 'encoder.json')
+    encoder.save(path)
+    restored, _ = MetadataEncoder.load(path).transform(pd.DataFrame({'source': ['batch', 'api']}))
+    np.testing.assert_array_equal(restored[:, 0], [3, 1])
@@ -0,0 +1,62 @@
+import math
+import threading
+import time
+
+import pytest
+
+from src.utils.process_pool import (
+    IsolatedProcessPool,
+    OperationTimeout,
+    PoolBusyError,
+    RemoteError,
+)
+
+
+@pytest.fixture
+def pool():
+    # Workers run stdlib functions, which unpickle in any start method
+    pool = IsolatedProcessPool(num_workers=1, max_pending=0, queue_timeout=0.1)
+    yield pool
+    pool.shutdown()
+
+
+def test_run_returns_result(pool):
+    assert pool.run(math.sqrt, 16.0, timeout=30) == 4.0
+    assert pool.stats()['completed'] == 1
+
+
+def test_remote_exception_is_raised_and_worker_kept(pool):
+    with pytest.raises(RemoteError) as excinfo:
+        pool.run(math.sqrt, -1.0, timeout=30)
+
+    assert 'math domain error' in str(excinfo.value)
+    assert 'ValueError' in excinfo.value.remote_traceback
+    assert pool.stats()['respawned'] == 0
+    assert pool.run(math.sqrt, 9.0, timeout=30) == 3.0
+
+
+def test_timeout_replaces_worker(pool):
+    with pytest.raises(OperationTimeout):
+        pool.run(time.sleep, 30, timeout=0.5)
+
+    stats = pool.stats()
+    assert stats['timed_out'] == 1
+    assert stats['respawned'] == 1
+    # The replacement worker takes new operations
+    assert pool.run(math.sqrt, 4.0, timeout=30) == 2.0
+
+
+def test_busy_pool_rejects_callers(pool):
+    pool.run(math.sqrt, 1.0, timeout=30)  # worker is up
+    busy = threading.Thread(target=pool.run, args=(time.sleep, 1.0), kwargs={'timeout': 30})
+    busy.start()
+    try:
+        deadline = time.monotonic() + 5
+        while pool.stats()['idle'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with pytest.raises(PoolBusyError):
+            pool.run(math.sqrt, 1.0, timeout=30)
+    finally:
+        busy.join()
+
+    assert pool.stats()['rejected'] == 1